@@ -0,0 +1,69 @@
+"""
+Per-hop block latency and fork rate with full and compact block relay.
+
+A hop is measured at each peer as the time it received a block minus the time the
+first of its neighbours accepted, and so started relaying, the block. The fork rate
+is the share of mined blocks that are not in the longest chain of the first peer.
+The average size of the mined blocks, in txns plus one for the header, is shown as
+the gain of compact relay grows with it.
+
+Usage:
+    python -m benchmarks.block_relay
+"""
+import argparse
+import time
+import numpy as np
+
+from blocktree import UNSEEN, ACCEPTED
+from simulation import Simulation
+
+
+def hop_latencies(sim):
+    tree = sim.tree
+    count = len(tree.blocks)
+    accepted = np.where(tree.state[:, :count] == ACCEPTED, tree.time[:, :count], np.inf)
+    hops = []
+    for peer in sim.peers:
+        neighbours = [nbr.peer_id for nbr in peer.connected_peers]
+        first_relay = accepted[neighbours].min(axis=0)
+        seen = (tree.state[peer.peer_id, :count] != UNSEEN) & (tree.miner[:count] != peer.peer_id) & np.isfinite(first_relay)
+        seen[:2] = False # no block and genesis block
+        hops.append(tree.time[peer.peer_id, :count][seen] - first_relay[seen])
+    return np.concatenate(hops)
+
+
+def run_scenario(block_relay, seed, **params):
+    sim = Simulation(block_relay=block_relay, seed=seed, **params)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    stats = sim.summary()
+    fraction = stats['fraction_in_longest_chain']
+    sizes = [block.size for block in sim.tree.blocks[2:]]
+    return hop_latencies(sim), np.nan if fraction is None else 1 - fraction, stats['blocks_mined'], sizes, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full and compact block relay")
+    parser.add_argument("--n", type=int, default=15, help="Number of peers")
+    parser.add_argument("--z0", type=float, default=50, help="Percentage of slow peers")
+    parser.add_argument("--txn-mean", type=float, default=8, help="Interarrival time between transactions")
+    parser.add_argument("--simulation-time", type=float, default=50000, help="Simulated time of each run")
+    parser.add_argument("--seeds", type=int, default=3, help="Number of seeds per mode")
+    parser.add_argument("--gossip", choices=["flood", "inv"], default="inv", help="Transaction relay of the runs")
+    args = parser.parse_args()
+
+    params = dict(n=args.n, z0=args.z0, txn_mean=args.txn_mean, simulation_time=args.simulation_time, gossip=args.gossip)
+    print(f"{'relay':<9}{'hop mean':>10}{'hop p50':>10}{'hop p95':>10}{'blocks':>8}{'avg size':>10}{'fork rate':>11}{'seconds':>10}")
+    for block_relay in ("full", "compact"):
+        results = [run_scenario(block_relay, seed, **params) for seed in range(args.seeds)]
+        hops = np.concatenate([hop for hop, _, _, _, _ in results])
+        blocks = sum(mined for _, _, mined, _, _ in results)
+        # runs without any mined block have no fork rate, hop latencies or sizes
+        forks = sum(rate * mined for _, rate, mined, _, _ in results if mined) / blocks if blocks else np.nan
+        sizes = [size for _, _, _, sizes, _ in results for size in sizes]
+        size = np.mean(sizes) if sizes else np.nan
+        mean, p50, p95 = (hops.mean(), *np.percentile(hops, [50, 95])) if len(hops) else (np.nan,) * 3
+        elapsed = sum(seconds for _, _, _, _, seconds in results)
+        print(f"{block_relay:<9}{mean:>10.1f}{p50:>10.1f}{p95:>10.1f}"
+              f"{blocks:>8}{size:>10.1f}{forks:>11.3f}{elapsed:>10.2f}")
@@ -0,0 +1,61 @@
+"""
+Events-per-second benchmark of the event queue backends.
+
+Runs the default scenario and an n=1000 scenario with each backend, then a
+classic hold model (pop one event, push one later event) at fixed queue sizes.
+
+Usage:
+    python -m benchmarks.event_throughput
+"""
+import argparse
+import random
+import time
+
+from event_queue import QUEUES, make_queue
+from simulation import Simulation
+
+
+def run_scenario(queue, **params):
+    sim = Simulation(queue=queue, **params)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    events = sim.events # cancelled and dropped events are not counted
+    return events, elapsed
+
+
+def hold(queue, size, operations, seed=69):
+    rng = random.Random(seed)
+    q = make_queue(queue)
+    for i in range(size):
+        q.push(rng.expovariate(1), i)
+    start = time.perf_counter()
+    for i in range(operations):
+        now, _ = q.pop()
+        q.push(now + rng.expovariate(1), i)
+    return operations / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the event queue backends")
+    parser.add_argument("--large-n", type=int, default=1000, help="Number of peers of the large scenario")
+    parser.add_argument("--large-time", type=float, default=300, help="Simulated time of the large scenario")
+    parser.add_argument("--large-txn-mean", type=float, default=1000, help="Interarrival time between transactions of the large scenario")
+    args = parser.parse_args()
+
+    scenarios = [
+        ("default", dict()),
+        (f"n={args.large_n}", dict(n=args.large_n, txn_mean=args.large_txn_mean, simulation_time=args.large_time)),
+    ]
+
+    print(f"{'scenario':<10}{'queue':<10}{'events':>10}{'seconds':>10}{'events/s':>12}")
+    for name, params in scenarios:
+        for queue in QUEUES:
+            events, elapsed = run_scenario(queue, **params)
+            print(f"{name:<10}{queue:<10}{events:>10}{elapsed:>10.2f}{events / elapsed:>12.0f}")
+
+    print()
+    print(f"{'hold size':<10}{'queue':<10}{'ops/s':>12}")
+    for size in (10**3, 10**5, 10**6):
+        for queue in QUEUES:
+            print(f"{size:<10}{queue:<10}{hold(queue, size, 200000):>12.0f}")
@@ -0,0 +1,88 @@
+"""
+Accuracy and speed of analytic transaction gossip against flooding every hop.
+
+First, a flood run is traced and the delay of every txn at every peer is compared
+with the shortest-path delay the analytic mode uses. Flooding takes the first of many
+paths with random queuing delays, so single arrivals stray from the model, built on
+mean link delays, while the mean delay should agree.
+Then both modes are run over several seeds on a small network and once on a large
+one, comparing the wall time with blocks mined, longest chain, fork rate (the share
+of mined blocks not in the longest chain of the first peer) and txns per block.
+
+Usage:
+    python -m benchmarks.fastforward
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+from simulation import Simulation
+from fastforward import delay_matrix
+from eventtrace import read_trace, TXN_CREATED, TXN_RECEIVED
+
+
+def arrival_errors(**params):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.bin')
+        sim = Simulation(gossip='flood', trace_path=path, trace_txns=True, **params)
+        sim.run()
+        _, records = read_trace(path)
+        created = records[records['kind'] == TXN_CREATED]
+        received = records[records['kind'] == TXN_RECEIVED]
+        start = dict(zip(created['id'].tolist(), zip(created['time'].tolist(), created['peer'].tolist())))
+        times, origins = np.array([start[txn] for txn in received['id'].tolist()]).T
+        return received['time'] - times, delay_matrix(sim.links)[received['peer'], origins.astype(int)]
+
+
+def run_scenario(gossip, seed, **params):
+    sim = Simulation(gossip=gossip, seed=seed, **params)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    stats = sim.summary()
+    fraction = stats['fraction_in_longest_chain']
+    sizes = [len(block.txn_in_blk) - 1 for block in sim.tree.blocks[2:]]
+    return (stats['blocks_mined'], stats['longest_chain'], np.nan if fraction is None else 1 - fraction,
+            np.mean(sizes) if sizes else np.nan, sim.events, elapsed)
+
+
+def compare(name, seeds, params):
+    print(f"{name}: {params}")
+    print(f"{'gossip':<10}{'blocks':>14}{'longest chain':>16}{'fork rate':>16}{'txns/block':>16}{'events':>10}{'seconds':>10}")
+    results = dict()
+    for gossip in ("flood", "analytic"):
+        runs = np.array([run_scenario(gossip, seed, **params) for seed in range(seeds)])
+        mean, spread = np.nanmean(runs, axis=0), np.nanstd(runs, axis=0)
+        results[gossip] = mean
+        print(f"{gossip:<10}{mean[0]:>8.1f} ±{spread[0]:>4.1f}{mean[1]:>10.1f} ±{spread[1]:>4.1f}"
+              f"{mean[2]:>10.3f} ±{spread[2]:>4.3f}{mean[3]:>10.1f} ±{spread[3]:>4.1f}{mean[4]:>10.0f}{mean[5]:>10.2f}")
+    flood, analytic = results["flood"], results["analytic"]
+    print(f"speedup {flood[5] / analytic[5]:.1f}x, events {flood[4] / analytic[4]:.0f}x fewer, "
+          f"error: blocks {analytic[0] / flood[0] - 1:+.1%}, longest chain {analytic[1] / flood[1] - 1:+.1%}, "
+          f"fork rate {analytic[2] - flood[2]:+.3f}, txns/block {analytic[3] / flood[3] - 1:+.1%}")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare analytic transaction gossip with flooding")
+    parser.add_argument("--n", type=int, default=20, help="Number of peers of the small scenario")
+    parser.add_argument("--txn-mean", type=float, default=20, help="Interarrival time between transactions of the small scenario")
+    parser.add_argument("--simulation-time", type=float, default=20000, help="Simulated time of the small scenario")
+    parser.add_argument("--seeds", type=int, default=5, help="Number of seeds of the small scenario")
+    parser.add_argument("--large-n", type=int, default=300, help="Number of peers of the large scenario")
+    parser.add_argument("--large-txn-mean", type=float, default=1000, help="Interarrival time between transactions of the large scenario")
+    parser.add_argument("--large-time", type=float, default=20000, help="Simulated time of the large scenario")
+    parser.add_argument("--large-seeds", type=int, default=1, help="Number of seeds of the large scenario")
+    args = parser.parse_args()
+
+    small = dict(n=args.n, txn_mean=args.txn_mean, simulation_time=args.simulation_time)
+    actual, predicted = arrival_errors(**dict(small, simulation_time=args.simulation_time / 10))
+    error = predicted - actual
+    print(f"txn delay over {len(actual)} arrivals: flood {actual.mean():.1f}, analytic {predicted.mean():.1f}, "
+          f"mean error {error.mean():+.1f}, p5 {np.percentile(error, 5):+.1f}, p95 {np.percentile(error, 95):+.1f}")
+    print()
+
+    compare("small", args.seeds, small)
+    compare("large", args.large_seeds, dict(n=args.large_n, txn_mean=args.large_txn_mean, simulation_time=args.large_time))
@@ -0,0 +1,48 @@
+"""
+Event volume and wall time of flood and inv transaction gossip.
+
+Runs the same scenarios with each gossip mode and reports the number of events
+processed, the wall time and the share of sent transactions that reached every peer.
+
+Usage:
+    python -m benchmarks.gossip
+"""
+import argparse
+import time
+import networkx as nx
+
+from simulation import Simulation
+from txnstore import TxnSet
+
+
+def run_scenario(gossip, graph=None, **params):
+    sim = Simulation(gossip=gossip, graph=graph, **params)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    events = sim.events
+    sent = TxnSet()
+    for peer in sim.peers:
+        sent |= peer.txnReceived
+    coverage = sum(len(peer.txnReceived) for peer in sim.peers) / (len(sent) * sim.n) if sent else 1.0
+    return events, elapsed, coverage
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare flood and inv transaction gossip")
+    parser.add_argument("--large-n", type=int, default=500, help="Number of peers of the large scenario")
+    parser.add_argument("--large-time", type=float, default=2000, help="Simulated time of the large scenario")
+    parser.add_argument("--large-txn-mean", type=float, default=200, help="Interarrival time between transactions of the large scenario")
+    args = parser.parse_args()
+
+    large_graph = nx.random_regular_graph(4, args.large_n, seed=69)
+    scenarios = [
+        ("default", None, dict()),
+        (f"n={args.large_n}", large_graph, dict(n=args.large_n, txn_mean=args.large_txn_mean, simulation_time=args.large_time)),
+    ]
+
+    print(f"{'scenario':<10}{'gossip':<8}{'events':>10}{'seconds':>10}{'coverage':>10}")
+    for name, graph, params in scenarios:
+        for gossip in ("flood", "inv"):
+            events, elapsed, coverage = run_scenario(gossip, graph, **params)
+            print(f"{name:<10}{gossip:<8}{events:>10}{elapsed:>10.2f}{coverage:>10.3f}")
@@ -0,0 +1,83 @@
+"""
+Memory benchmark for the block balance ledger.
+
+Builds the same chain of blocks twice, once copying the full balance list per
+block (the previous behaviour) and once with the delta ledger, and reports the
+memory held by the chain.
+
+Usage:
+    python -m benchmarks.ledger_memory --n 1000 --blocks 5000
+"""
+import argparse
+import tracemalloc
+import numpy as np
+
+from block import Block
+from txnstore import TxnStore
+
+
+class CopyBlock:
+    """
+    Block that copies its parent's full balance list, as before the ledger.
+    """
+    def __init__(self, parent_blk, txn_in_blk, txns, balance=None):
+        self.parent_blk = parent_blk
+        self.txn_in_blk = txn_in_blk
+        self.balance = list(balance) if parent_blk is None else parent_blk.balance.copy()
+        for peer_id, change in txns.deltas(txn_in_blk).items():
+            self.balance[peer_id] += change
+
+
+def make_txns(rng, n, num_blocks, txns_per_block):
+    txns = TxnStore()
+    chain_txns = []
+    txn_id = 0
+    for _ in range(num_blocks):
+        miner = int(rng.integers(n))
+        ids = [txns.add(txn_id, miner, miner, 50, True)]
+        txn_id += 1
+        for sender, receiver in rng.integers(n, size=(txns_per_block, 2)).tolist():
+            ids.append(txns.add(txn_id, sender, receiver, 1))
+            txn_id += 1
+        chain_txns.append(np.array(ids, dtype=np.int64))
+    return txns, chain_txns
+
+
+def measure(build):
+    tracemalloc.start()
+    chain = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return chain, current, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare balance copying against the delta ledger")
+    parser.add_argument("--n", type=int, default=1000, help="Number of peers")
+    parser.add_argument("--blocks", type=int, default=5000, help="Number of blocks in the chain")
+    parser.add_argument("--txns", type=int, default=20, help="Transactions per block")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(69)
+    txns, chain_txns = make_txns(rng, args.n, args.blocks, args.txns)
+
+    def build_copy():
+        tip = CopyBlock(None, [], txns, [1000] * args.n)
+        for txn_ids in chain_txns:
+            tip = CopyBlock(tip, txn_ids, txns)
+        return tip
+
+    def build_delta():
+        tip = Block(parent_blk=0, miner=None, balance=[1000] * args.n, blk_id=1)
+        for txn_ids in chain_txns:
+            tip = Block(None, tip, txn_ids, txns=txns)
+        return tip
+
+    copy_tip, copy_mem, copy_peak = measure(build_copy)
+    delta_tip, delta_mem, delta_peak = measure(build_delta)
+    assert copy_tip.balance == delta_tip.balances()
+
+    print(f"n={args.n}, blocks={args.blocks}, txns/block={args.txns}")
+    print(f"{'ledger':<8}{'held MiB':>12}{'peak MiB':>12}{'bytes/block':>14}")
+    for name, mem, peak in (("copy", copy_mem, copy_peak), ("delta", delta_mem, delta_peak)):
+        print(f"{name:<8}{mem / 2**20:>12.2f}{peak / 2**20:>12.2f}{mem / args.blocks:>14.0f}")
@@ -0,0 +1,53 @@
+"""
+Wall time and chain statistics of the sequential engine and of the parallel one.
+
+Runs with partitions draw their mining times and link delays from other streams than
+the sequential runs, so they are compared over several seeds: blocks mined, longest
+chain and fork rate (the share of mined blocks not in the longest chain of the first
+peer) should agree within the spread between seeds. The speedup depends on the number
+of cores, each partition runs in its own process.
+
+Usage:
+    python -m benchmarks.pdes
+    python -m benchmarks.pdes --n 1000 --txn-mean 20000 --seeds 1 --gossip flood
+"""
+import argparse
+import os
+import time
+import numpy as np
+
+from simulation import Simulation
+from pdes import ParallelSimulation
+
+
+def run_scenario(parts, seed, **params):
+    start = time.perf_counter()
+    if parts == 1:
+        sim = Simulation(seed=seed, **params)
+    else:
+        sim = ParallelSimulation(parts=parts, seed=seed, **params)
+    sim.run()
+    elapsed = time.perf_counter() - start
+    stats = sim.summary()
+    fraction = stats['fraction_in_longest_chain']
+    return stats['blocks_mined'], stats['longest_chain'], np.nan if fraction is None else 1 - fraction, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the sequential and the parallel engine")
+    parser.add_argument("--n", type=int, default=40, help="Number of peers")
+    parser.add_argument("--txn-mean", type=float, default=8, help="Interarrival time between transactions")
+    parser.add_argument("--simulation-time", type=float, default=20000, help="Simulated time of each run")
+    parser.add_argument("--seeds", type=int, default=5, help="Number of seeds per engine")
+    parser.add_argument("--partitions", type=int, nargs="+", default=[1, 2, 4], help="Partition counts, 1 for the sequential engine")
+    parser.add_argument("--gossip", choices=["flood", "inv"], default="inv", help="Transaction relay of the runs")
+    args = parser.parse_args()
+
+    params = dict(n=args.n, txn_mean=args.txn_mean, simulation_time=args.simulation_time, gossip=args.gossip)
+    print(f"cores: {os.cpu_count()}")
+    print(f"{'partitions':<12}{'blocks':>14}{'longest chain':>16}{'fork rate':>16}{'seconds':>10}")
+    for parts in args.partitions:
+        results = np.array([run_scenario(parts, seed, **params) for seed in range(args.seeds)])
+        mean, spread = results.mean(axis=0), results.std(axis=0)
+        print(f"{parts:<12}{mean[0]:>8.1f} ±{spread[0]:>4.1f}{mean[1]:>10.1f} ±{spread[1]:>4.1f}"
+              f"{mean[2]:>10.3f} ±{spread[2]:>4.3f}{mean[3]:>10.2f}")
@@ -0,0 +1,160 @@
+"""
+Scaling benchmark of the simulator.
+
+Runs simulations headless, without logs or figures, at a fixed seed and records
+for each run the setup and run wall time, the events processed per second, the
+peak resident memory and, through instrument.Instrumentation, the time spent in
+each event handler. Every run is
+done in a fresh worker process, so peak memory is per run. All runs use the
+default bounded-degree topology, whose construction is part of the setup time.
+
+Results are written as JSON and can be compared against a stored baseline from the
+same machine; runs slower or larger than the baseline by more than the tolerance
+are flagged, and the script exits with status 1.
+
+Usage:
+    python -m benchmarks.scaling --output results.json
+    python -m benchmarks.scaling --baseline benchmarks/baseline.json
+    python -m benchmarks.scaling --n 15 100 --txn-mean 8 80 --simulation-time 1000 5000
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from helper import SEED
+from memory import peak_rss
+from simulation import Simulation
+from instrument import Instrumentation
+
+# default runs, the transaction rate is scaled down with n to keep each run within a minute
+SUITE = [
+    dict(n=15, txn_mean=8, simulation_time=2000),
+    dict(n=100, txn_mean=100, simulation_time=2000),
+    dict(n=1000, txn_mean=2000, simulation_time=1000),
+    dict(n=5000, txn_mean=20000, simulation_time=500),
+]
+# relative change from the baseline that counts as a regression
+TOLERANCE = 0.2
+# (metric, True if higher is better)
+METRICS = [('events_per_sec', True), ('wall_time', False), ('setup_time', False), ('peak_rss', False)]
+
+def run_one(params):
+    """
+    Run and measure one simulation.
+
+    Args:
+        params (dict): Keyword arguments of Simulation, with at least n and seed.
+
+    Returns:
+        dict: The parameters and measurements of the run.
+    """
+    start = time.perf_counter()
+    sim = Simulation(**params)
+    setup_time = time.perf_counter() - start
+
+    instrument = Instrumentation(sim)
+    instrument.run()
+    report = instrument.report()
+
+    events = sum(event['count'] for event in report['events'].values())
+    return dict(params, setup_time=setup_time, wall_time=instrument.wall_time, events=events,
+                events_per_sec=events / instrument.wall_time, peak_rss=peak_rss(),
+                handler_time={name: event['seconds'] for name, event in report['events'].items()},
+                handler_count={name: event['count'] for name, event in report['events'].items()},
+                mining=report['mining'], max_queue_depth=max(depth for _, depth in report['queue_depth']))
+
+def run_suite(runs):
+    """
+    Run simulations one at a time, each in a fresh process.
+
+    Args:
+        runs (list): Keyword arguments of Simulation of each run.
+
+    Returns:
+        list: The results of run_one, in order.
+    """
+    results = []
+    for params in runs:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(run_one, params).result())
+        print_row(results[-1])
+    return results
+
+def run_key(run):
+    return (run['n'], run['txn_mean'], run['simulation_time'], run['seed'])
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Compare results against a baseline.
+
+    Args:
+        results (list): Results of run_suite.
+        baseline (list): Results of an earlier run_suite, matched to results by parameters.
+        tolerance (float): Relative change that counts as a regression.
+
+    Returns:
+        tuple: (regressions, changed), lists of messages for the runs slower or larger than
+        the baseline and for the runs whose event count changed, which cannot be compared.
+    """
+    previous = {run_key(run): run for run in baseline}
+    regressions, changed = [], []
+    for run in results:
+        old = previous.get(run_key(run))
+        if old is None:
+            continue
+        name = 'n={} txn_mean={} simulation_time={} seed={}'.format(*run_key(run))
+        if run['events'] != old['events']:
+            changed.append(f"{name}: events {old['events']} -> {run['events']}")
+            continue
+        for metric, higher_is_better in METRICS:
+            change = (run[metric] - old[metric]) / old[metric] if old[metric] else 0
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{name}: {metric} {old[metric]:.4g} -> {run[metric]:.4g} ({change:+.0%})")
+    return regressions, changed
+
+def print_row(run):
+    print(f"{run['n']:>6}{run['txn_mean']:>10g}{run['simulation_time']:>8g}{run['events']:>10}{run['setup_time']:>8.2f}"
+          f"{run['wall_time']:>9.2f}{run['events_per_sec']:>10.0f}{run['peak_rss'] / 2**20:>9.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the simulator across network sizes and loads")
+    parser.add_argument("--n", type=int, nargs='+', default=None, help="Numbers of peers")
+    parser.add_argument("--txn-mean", type=float, nargs='+', default=None, help="Interarrival times between transactions")
+    parser.add_argument("--simulation-time", type=float, nargs='+', default=None, help="Simulated times")
+    parser.add_argument("--seed", type=int, default=SEED, help="Seed of every run")
+    parser.add_argument("--output", type=str, default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Relative change that counts as a regression")
+    args = parser.parse_args()
+
+    if args.n or args.txn_mean or args.simulation_time:
+        runs = [dict(n=n, txn_mean=txn_mean, simulation_time=simulation_time)
+                for n, txn_mean, simulation_time in itertools.product(args.n or [15], args.txn_mean or [8],
+                                                                      args.simulation_time or [2000])]
+    else:
+        runs = SUITE
+    runs = [dict(run, seed=args.seed) for run in runs]
+
+    print(f"{'n':>6}{'txn_mean':>10}{'time':>8}{'events':>10}{'setup':>8}{'seconds':>9}{'events/s':>10}{'peak MiB':>9}")
+    results = run_suite(runs)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'runs': results}, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions, changed = compare(results, json.load(file)['runs'], args.tolerance)
+        print()
+        for message in changed:
+            print("CHANGED", message)
+        for message in regressions:
+            print("REGRESSION", message)
+        if not regressions:
+            print(f"No regressions against {args.baseline}")
+        else:
+            sys.exit(1)
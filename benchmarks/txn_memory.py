@@ -0,0 +1,77 @@
+"""
+Memory per million transactions of the columnar store against one object per transaction.
+
+In steady state every peer has received every transaction. The object layout holds a
+Transaction object per txn and, per peer, a set referencing all of them, as before the
+columnar store. The columnar layout holds the TxnStore columns and, per peer, a bitset
+with every txn set. The object layout is measured on fewer txns and scaled, as it
+grows with n times the number of txns.
+
+Usage:
+    python -m benchmarks.txn_memory
+    python -m benchmarks.txn_memory --n 100 1000 --txns 1000000
+"""
+import argparse
+import tracemalloc
+import numpy as np
+
+from txnstore import TxnStore, TxnSet
+
+
+class ObjectTxn:
+    """
+    Transaction as a Python object, as before the columnar store.
+    """
+    __slots__ = ('txnId', 'sender', 'receiver', 'coins', 'coinbase', 'included_in')
+
+    def __init__(self, txnId, sender, receiver, coins):
+        self.txnId = txnId
+        self.sender = sender
+        self.receiver = receiver
+        self.coins = coins
+        self.coinbase = False
+        self.included_in = ()
+
+
+def build_objects(n, count, rng):
+    senders, receivers = rng.integers(n, size=(2, count)).tolist()
+    txns = [ObjectTxn(txn_id, sender, receiver, 1) for txn_id, sender, receiver in zip(range(count), senders, receivers)]
+    received = [set(txns) for _ in range(n)]
+    return txns, received
+
+
+def build_columns(n, count, rng):
+    txns = TxnStore()
+    txns.add(count - 1, 0, 0) # one allocation of every column
+    txns.sender[:count], txns.receiver[:count] = rng.integers(n, size=(2, count))
+    txns.coins[:count] = 1
+    ids = np.arange(count)
+    received = []
+    for _ in range(n):
+        seen = TxnSet()
+        seen.update(ids)
+        received.append(seen)
+    return txns, received
+
+
+def measure(build, *args):
+    tracemalloc.start()
+    data = build(*args)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the memory of the columnar transaction store with transaction objects")
+    parser.add_argument("--n", type=int, nargs='+', default=[100, 1000], help="Numbers of peers")
+    parser.add_argument("--txns", type=int, default=1000000, help="Transactions of the columnar layout")
+    parser.add_argument("--object-txns", type=int, default=10000, help="Transactions of the object layout, scaled to --txns")
+    args = parser.parse_args()
+
+    print(f"{'n':>6}{'objects MiB/M':>16}{'columns MiB/M':>16}{'ratio':>8}")
+    for n in args.n:
+        objects = measure(build_objects, n, args.object_txns, np.random.default_rng(69)) * 1e6 / args.object_txns
+        columns = measure(build_columns, n, args.txns, np.random.default_rng(69)) * 1e6 / args.txns
+        print(f"{n:>6}{objects / 2**20:>16.1f}{columns / 2**20:>16.1f}{objects / columns:>8.1f}")
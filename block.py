@@ -1,37 +1,159 @@
+import numpy as np
+
+# every CHECKPOINT_INTERVAL-th block stores the full balance list,
+# all other blocks only store the balance changes made by their own transactions
+CHECKPOINT_INTERVAL = 64
+# txn_in_blk of the genesis block
+NO_TXNS = np.zeros(0, dtype=np.int64)
+
+def skip_height(height):
+    """
+    Get the height an ancestor skip pointer jumps to from a given height.
+
+    Heights are chosen so that any ancestor can be reached in O(log height) jumps.
+
+    Args:
+        height (int): Height of the block, counting the genesis block as 0.
+
+    Returns:
+        int: Height of the block the skip pointer refers to.
+    """
+    if height < 2:
+        return 0
+    if height & 1:
+        height -= 1
+        height &= height - 1
+        return (height & (height - 1)) + 1
+    return height & (height - 1)
+
 class Block:
-    blk_ctr = 2
-    def __init__(self, miner, parent_blk, txn_in_blk=set(), balance=[]):
+    __slots__ = ('blk_id', 'miner', 'parent_blk', 'txn_in_blk', 'chain_length', 'skip', 'size', 'delta', 'checkpoint')
+
+    def __init__(self, miner, parent_blk, txn_in_blk=NO_TXNS, balance=[], blk_id=None, txns=None):
         """
         Initialize a Block instance.
 
         Args:
             miner (Peer): The peer that mined this block.
             parent_blk (Block or int): The parent block of this block.
-            txn_in_blk (set): Set of transactions included in the block.
+            txn_in_blk (numpy.ndarray): txnIds of the transactions included in the block.
             balance (list): List representing the balance of each peer in the blockchain network.
+            blk_id (int): ID of the block. None until the block is mined and added to the block tree.
+            txns (TxnStore): Store holding the transactions, needed if there are any.
         """
         if parent_blk == 0 :
             # Genesis block initialization
-            self.blk_id = 1
-            self.txn_in_blk = set()
-            self.txn_mem_pool = set()
+            self.txn_in_blk = NO_TXNS
             self.chain_length = 1
-            self.balance = balance
+            self.skip = None
         else :
             # Regular block initialization
-            self.blk_id = Block.blk_ctr
-            Block.blk_ctr += 1
             self.txn_in_blk = txn_in_blk
-            self.txn_mem_pool = parent_blk.txn_mem_pool
             self.chain_length = parent_blk.chain_length + 1
-            self.balance = parent_blk.balance.copy()
+            self.skip = parent_blk.ancestor(skip_height(self.chain_length - 1) + 1)
 
+        self.blk_id = blk_id
         self.parent_blk = parent_blk
         self.size = 1 + len(txn_in_blk)
         self.miner = miner
-        # Update balance based on transactions in the block
-        for txns in txn_in_blk:
-            if not txns.coinbase:
-                self.balance[txns.sender.peer_id] -= txns.coins
-            self.balance[txns.receiver.peer_id] += txns.coins
-            self.txn_mem_pool.add(txns)
\ No newline at end of file
+        # Record balance changes made by transactions in the block
+        self.delta = txns.deltas(txn_in_blk) if len(txn_in_blk) else dict()
+
+        self.checkpoint = list(balance) if parent_blk == 0 else None
+        if self.chain_length % CHECKPOINT_INTERVAL == 0:
+            self.checkpoint = self.balances()
+
+    def ancestor(self, chain_length):
+        """
+        Get the ancestor of this block at a given chain length.
+
+        Args:
+            chain_length (int): Chain length of the ancestor, at most that of this block.
+
+        Returns:
+            Block: The ancestor block.
+        """
+        block, height, target = self, self.chain_length - 1, chain_length - 1
+        while height > target:
+            height_skip = skip_height(height)
+            height_skip_prev = skip_height(height - 1)
+            if block.skip is not None and (height_skip == target or (height_skip > target and
+                    not (height_skip_prev < height_skip - 2 and height_skip_prev >= target))):
+                block, height = block.skip, height_skip
+            else:
+                block, height = block.parent_blk, height - 1
+        return block
+
+    def index_txns(self, txns):
+        """
+        Record this block in the inclusion index of its transactions.
+
+        Called once the block is mined and has its blk_id, so discarded mining candidates
+        never enter the index.
+
+        Args:
+            txns (TxnStore): Store holding the transactions.
+        """
+        txns.index_block(self.txn_in_blk, self.blk_id)
+
+    def includes(self, txn, txns, blocks):
+        """
+        Check if a transaction is included in the chain ending at this block.
+
+        Args:
+            txn (int): txnId of the transaction to look up.
+            txns (TxnStore): Store holding the transaction.
+            blocks (list): Block objects by blk_id, BlockTree.blocks.
+
+        Returns:
+            bool: True if this block or one of its ancestors contains the transaction.
+        """
+        for blk_id in txns.blocks_of(txn):
+            block = blocks[blk_id]
+            if block.chain_length <= self.chain_length and self.ancestor(block.chain_length) is block:
+                return True
+        return False
+
+    def get_balance(self, peer_id):
+        """
+        Get the balance of a peer at the end of this block.
+
+        The deltas of the blocks up to the nearest checkpoint are summed, so a
+        lookup costs at most CHECKPOINT_INTERVAL dictionary reads. BlockTree.balance
+        caches the result for blocks of the tree.
+
+        Args:
+            peer_id (int): ID of the peer.
+
+        Returns:
+            int: The balance of the peer.
+        """
+        balance = 0
+        block = self
+        while block.checkpoint is None:
+            balance += block.delta.get(peer_id, 0)
+            block = block.parent_blk
+        balance += block.checkpoint[peer_id]
+        return balance
+
+    def balances(self):
+        """
+        Get the full balance list at the end of this block.
+
+        Returns:
+            list: The balance of each peer in the blockchain network.
+        """
+        if self.checkpoint is not None:
+            return self.checkpoint.copy()
+
+        deltas = []
+        block = self
+        while block.checkpoint is None:
+            deltas.append(block.delta)
+            block = block.parent_blk
+
+        balance = block.checkpoint.copy()
+        for delta in deltas:
+            for peer_id, change in delta.items():
+                balance[peer_id] += change
+        return balance
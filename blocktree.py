@@ -0,0 +1,206 @@
+from collections import OrderedDict
+import numpy as np
+import networkx as nx
+
+from eventtrace import MINED, RECEIVED, ACCEPTED as TRACE_ACCEPTED
+
+# per-peer state of a block
+UNSEEN, RECEIVED, ACCEPTED = 0, 1, 2
+# maximum number of (block, peer) balances kept in the lookup cache of a tree
+BALANCE_CACHE_SIZE = 1 << 16
+
+class BlockTree:
+    """
+    Tree of all mined blocks of a simulation, shared by every peer.
+
+    Blocks are stored in arrays indexed by blk_id; block IDs are handed out densely
+    when a block is mined, starting with 1 for the genesis block. Each peer only
+    keeps a row in the per-peer arrays, recording whether it received or accepted
+    a block and when.
+
+    Attributes:
+        blocks (list): Block objects by blk_id, None at index 0.
+        parent (numpy.ndarray): blk_id of the parent of each block, 0 for the genesis block.
+        height (numpy.ndarray): Chain length of each block, 1 for the genesis block.
+        miner (numpy.ndarray): peer_id of the miner of each block, -1 for the genesis block.
+        created (numpy.ndarray): Time at which each block was mined.
+        state (numpy.ndarray): UNSEEN, RECEIVED or ACCEPTED per peer (rows) and block (columns).
+        time (numpy.ndarray): Per peer and block, the time the block was accepted into the
+            peer's blockchain, or received if it was not accepted.
+        watchers (dict): Function called with the blk_id of each block accepted by a peer, by peer_id.
+        trace (TraceWriter): Trace of the block events, None if not traced.
+        balance_cache (OrderedDict): Recently looked up balances by (blk_id, peer_id), least recent first.
+    """
+    def __init__(self, n_peers, genesis, capacity=1024):
+        """
+        Initialize a BlockTree holding only the genesis block.
+
+        Args:
+            n_peers (int): Number of peers.
+            genesis (Block): The genesis block, with blk_id 1.
+            capacity (int): Initial number of block slots.
+        """
+        self.blocks = [None, genesis]
+        self.parent = np.zeros(capacity, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.miner = np.full(capacity, -1, dtype=np.int32)
+        self.created = np.zeros(capacity)
+        self.state = np.zeros((n_peers, capacity), dtype=np.uint8)
+        self.time = np.full((n_peers, capacity), np.nan)
+        self.watchers = dict()
+        self.trace = None
+        self.balance_cache = OrderedDict()
+
+        self.height[1] = 1
+        self.state[:, 1] = ACCEPTED
+        self.time[:, 1] = 0
+
+    def __len__(self):
+        """
+        Get the number of blocks, including the genesis block.
+        """
+        return len(self.blocks) - 1
+
+    def _grow(self):
+        capacity = 2 * len(self.parent)
+        for name in ('parent', 'height', 'miner', 'created'):
+            old = getattr(self, name)
+            new = np.full(capacity, -1 if name == 'miner' else 0, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        state = np.zeros((self.state.shape[0], capacity), dtype=np.uint8)
+        state[:, :self.state.shape[1]] = self.state
+        time = np.full((self.time.shape[0], capacity), np.nan)
+        time[:, :self.time.shape[1]] = self.time
+        self.state, self.time = state, time
+
+    def add(self, block, time, blk_id=None):
+        """
+        Add a newly mined block and give it the next block ID.
+
+        Args:
+            block (Block): The mined block, whose parent is already in the tree.
+            time (float): Time at which the block was mined.
+            blk_id (int): ID to give the block instead of the next one, for trees holding
+                part of the blocks of a simulation. Skipped IDs are None in blocks.
+
+        Returns:
+            int: The blk_id of the block.
+        """
+        if blk_id is None:
+            blk_id = len(self.blocks)
+        while blk_id >= len(self.parent):
+            self._grow()
+        block.blk_id = blk_id
+        if blk_id >= len(self.blocks):
+            self.blocks.extend([None] * (blk_id + 1 - len(self.blocks)))
+        self.blocks[blk_id] = block
+        self.parent[blk_id] = block.parent_blk.blk_id
+        self.height[blk_id] = block.chain_length
+        self.miner[blk_id] = block.miner.peer_id
+        self.created[blk_id] = time
+        if self.trace is not None:
+            self.trace.record(MINED, time, block.miner.peer_id, blk_id, block.parent_blk.blk_id, len(block.txn_in_blk))
+        return blk_id
+
+    def balance(self, block, peer_id):
+        """
+        Get the balance of a peer at the end of a block of the tree, through the cache.
+
+        Args:
+            block (Block): The block, already added to the tree.
+            peer_id (int): ID of the peer.
+
+        Returns:
+            int: The balance of the peer.
+        """
+        cache = self.balance_cache
+        key = (block.blk_id, peer_id)
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        balance = cache[key] = block.get_balance(peer_id)
+        if len(cache) > BALANCE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return balance
+
+    def receive(self, peer_id, blk_id, time):
+        """
+        Mark a block as received by a peer.
+
+        Args:
+            peer_id (int): ID of the peer.
+            blk_id (int): ID of the block.
+            time (float): Time of arrival.
+        """
+        self.state[peer_id, blk_id] = RECEIVED
+        self.time[peer_id, blk_id] = time
+        if self.trace is not None:
+            self.trace.record(RECEIVED, time, peer_id, blk_id)
+
+    def forget(self, peer_id, blk_id):
+        """
+        Mark a received block as unseen again, so it can be received another time.
+
+        Args:
+            peer_id (int): ID of the peer.
+            blk_id (int): ID of the block.
+        """
+        self.state[peer_id, blk_id] = UNSEEN
+        self.time[peer_id, blk_id] = np.nan
+
+    def accept(self, peer_id, blk_id, time):
+        """
+        Mark a block as part of a peer's blockchain.
+
+        Args:
+            peer_id (int): ID of the peer.
+            blk_id (int): ID of the block.
+            time (float): Time at which the block was added to the blockchain.
+        """
+        self.state[peer_id, blk_id] = ACCEPTED
+        self.time[peer_id, blk_id] = time
+        if self.trace is not None:
+            self.trace.record(TRACE_ACCEPTED, time, peer_id, blk_id)
+        watcher = self.watchers.get(peer_id)
+        if watcher is not None:
+            watcher(blk_id)
+
+    def watch(self, peer_id, callback):
+        """
+        Call a function with the blk_id of every block a peer accepts from now on.
+
+        Args:
+            peer_id (int): ID of the peer.
+            callback (callable): The function, replacing any previous one for the peer.
+        """
+        self.watchers[peer_id] = callback
+
+    def accepted(self, peer_id):
+        """
+        Get the blocks in a peer's blockchain, in the order they were added.
+
+        Args:
+            peer_id (int): ID of the peer.
+
+        Returns:
+            numpy.ndarray: The blk_ids, sorted by time added then by ID, so parents come first.
+        """
+        ids = np.flatnonzero(self.state[peer_id, :len(self.blocks)] == ACCEPTED)
+        return ids[np.lexsort((ids, self.time[peer_id, ids]))]
+
+    def peer_graph(self, peer_id):
+        """
+        Build the blockchain of a peer as a graph with an edge from each block to its parent.
+
+        Args:
+            peer_id (int): ID of the peer.
+
+        Returns:
+            networkx.DiGraph: The graph.
+        """
+        g = nx.DiGraph()
+        ids = self.accepted(peer_id)
+        ids = ids[ids != 1]
+        g.add_edges_from(zip(ids.tolist(), self.parent[ids].tolist()))
+        return g
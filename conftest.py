@@ -0,0 +1 @@
+# the modules sit at the root of the repository, this file puts it on sys.path for tests/
@@ -0,0 +1,275 @@
+import heapq
+import math
+
+# cancelled entries are removed at once when they outnumber this share of the queue
+COMPACT_FRACTION = 0.5
+# and this number, so small queues are not rebuilt for a few cancellations
+COMPACT_MIN = 1024
+
+class HeapQueue:
+    """
+    Event queue backed by a binary heap.
+
+    Entries are (time, seq, item) tuples. The sequence number is unique, so events
+    with equal times are popped in insertion order and items are never compared.
+    It is also the token of the event: a cancelled event stays in the heap, is
+    skipped when it reaches the top and is dropped when the heap is compacted.
+    """
+    def __init__(self):
+        """
+        Initialize an empty HeapQueue.
+        """
+        self.heap = []
+        self.seq = 0
+        self.cancelled = set()
+
+    def __len__(self):
+        return len(self.heap) - len(self.cancelled)
+
+    def push(self, time, item):
+        """
+        Add an event to the queue.
+
+        Args:
+            time (float): Time of the event.
+            item: The event.
+
+        Returns:
+            int: Token of the event, to cancel it.
+        """
+        heapq.heappush(self.heap, (time, self.seq, item))
+        self.seq += 1
+        return self.seq - 1
+
+    def cancel(self, token):
+        """
+        Cancel a pending event in O(1).
+
+        Args:
+            token (int): Token returned by push for an event that was not popped yet.
+        """
+        self.cancelled.add(token)
+        if len(self.cancelled) > max(COMPACT_MIN, COMPACT_FRACTION * len(self.heap)):
+            self.compact()
+
+    def compact(self):
+        """
+        Remove the cancelled events from the heap.
+        """
+        cancelled = self.cancelled
+        self.heap = [entry for entry in self.heap if entry[1] not in cancelled]
+        heapq.heapify(self.heap)
+        cancelled.clear()
+
+    def pop(self):
+        """
+        Remove the earliest event from the queue.
+
+        Returns:
+            tuple: (time, item) of the event.
+        """
+        time, seq, item = heapq.heappop(self.heap)
+        while self.cancelled and seq in self.cancelled:
+            self.cancelled.remove(seq)
+            time, seq, item = heapq.heappop(self.heap)
+        return time, item
+
+    def peek_time(self):
+        """
+        Get the time of the earliest event without removing it.
+
+        Returns:
+            float: Time of the earliest event.
+        """
+        while self.heap[0][1] in self.cancelled:
+            self.cancelled.remove(heapq.heappop(self.heap)[1])
+        return self.heap[0][0]
+
+
+class CalendarQueue:
+    """
+    Event queue backed by a calendar queue (R. Brown, 1988).
+
+    Events are hashed by time into buckets of fixed width, each bucket being a small
+    heap, so push and pop take O(1) on average. The number of buckets doubles or halves
+    with the queue size, and the bucket width is re-estimated from the spacing of the
+    earliest events on each resize. Ties are broken by insertion order, and events are
+    cancelled by token, like HeapQueue.
+    """
+    def __init__(self, nbuckets=2, width=1.0):
+        """
+        Initialize an empty CalendarQueue.
+
+        Args:
+            nbuckets (int): Initial number of buckets.
+            width (float): Initial width of a bucket in simulated time.
+        """
+        self.seq = 0
+        self.size = 0
+        self.last_time = 0.0
+        self.cancelled = set()
+        self._setup(nbuckets, width)
+
+    def __len__(self):
+        return self.size - len(self.cancelled)
+
+    def _setup(self, nbuckets, width):
+        """
+        Create empty buckets, positioned at the time of the last popped event.
+
+        Args:
+            nbuckets (int): Number of buckets.
+            width (float): Width of a bucket.
+        """
+        self.nbuckets = nbuckets
+        self.width = width
+        self.buckets = [[] for _ in range(nbuckets)]
+        self.year = math.floor(self.last_time / width) # index of the current bucket-width interval
+        self.top_threshold = 2 * nbuckets
+        self.bottom_threshold = nbuckets // 2 - 2
+
+    def _resize(self, nbuckets):
+        """
+        Rebuild the calendar with a new number of buckets and a re-estimated width.
+
+        Args:
+            nbuckets (int): New number of buckets.
+        """
+        entries = [entry for bucket in self.buckets for entry in bucket]
+        self._setup(nbuckets, self._estimate_width(entries))
+        for entry in entries:
+            heapq.heappush(self.buckets[math.floor(entry[0] / self.width) % self.nbuckets], entry)
+
+    def _estimate_width(self, entries):
+        """
+        Estimate a bucket width of about three times the average spacing of the earliest events.
+
+        Args:
+            entries (list): The (time, seq, item) entries of the queue.
+
+        Returns:
+            float: The bucket width.
+        """
+        times = [entry[0] for entry in heapq.nsmallest(min(len(entries), 25), entries)]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        if not gaps:
+            return self.width
+        average = sum(gaps) / len(gaps)
+        # ignore outliers, as in the original algorithm
+        gaps = [gap for gap in gaps if gap <= 2 * average]
+        average = sum(gaps) / len(gaps) if gaps else 0
+        return 3 * average if average > 0 else self.width
+
+    def push(self, time, item):
+        """
+        Add an event to the queue.
+
+        Args:
+            time (float): Time of the event, not earlier than the last popped event.
+            item: The event.
+
+        Returns:
+            int: Token of the event, to cancel it.
+        """
+        heapq.heappush(self.buckets[math.floor(time / self.width) % self.nbuckets], (time, self.seq, item))
+        self.seq += 1
+        self.size += 1
+        if self.size > self.top_threshold:
+            self._resize(2 * self.nbuckets)
+        return self.seq - 1
+
+    def cancel(self, token):
+        """
+        Cancel a pending event in O(1).
+
+        Args:
+            token (int): Token returned by push for an event that was not popped yet.
+        """
+        self.cancelled.add(token)
+        if len(self.cancelled) > max(COMPACT_MIN, COMPACT_FRACTION * self.size):
+            self.compact()
+
+    def compact(self):
+        """
+        Remove the cancelled events from the buckets.
+        """
+        cancelled = self.cancelled
+        for k, bucket in enumerate(self.buckets):
+            if bucket:
+                bucket = [entry for entry in bucket if entry[1] not in cancelled]
+                heapq.heapify(bucket)
+                self.buckets[k] = bucket
+        self.size -= len(cancelled)
+        cancelled.clear()
+        if self.size < self.bottom_threshold:
+            self._resize(max(2, self.nbuckets // 2))
+
+    def _find(self):
+        """
+        Find the bucket holding the earliest event and move the calendar to it.
+
+        Returns:
+            list: The bucket.
+        """
+        # the same floor() as in push decides whether an event falls in the current interval
+        year, width, buckets = self.year, self.width, self.buckets
+        for _ in range(self.nbuckets):
+            bucket = buckets[year % self.nbuckets]
+            if bucket and math.floor(bucket[0][0] / width) <= year:
+                self.year = year
+                return bucket
+            year += 1
+
+        # no event within a whole calendar, jump directly to the earliest one
+        bucket = min((bucket for bucket in buckets if bucket), key=lambda bucket: bucket[0])
+        self.year = math.floor(bucket[0][0] / width)
+        return bucket
+
+    def pop(self):
+        """
+        Remove the earliest event from the queue.
+
+        Returns:
+            tuple: (time, item) of the event.
+        """
+        if len(self) == 0:
+            raise IndexError("pop from an empty queue")
+        time, seq, item = heapq.heappop(self._find())
+        self.size -= 1
+        while self.cancelled and seq in self.cancelled:
+            self.cancelled.remove(seq)
+            time, seq, item = heapq.heappop(self._find())
+            self.size -= 1
+        self.last_time = time
+        if self.size < self.bottom_threshold:
+            self._resize(self.nbuckets // 2)
+        return time, item
+
+    def peek_time(self):
+        """
+        Get the time of the earliest event without removing it.
+
+        Returns:
+            float: Time of the earliest event.
+        """
+        bucket = self._find()
+        while bucket[0][1] in self.cancelled:
+            self.cancelled.remove(heapq.heappop(bucket)[1])
+            self.size -= 1
+            bucket = self._find()
+        return bucket[0][0]
+
+
+QUEUES = {'heap': HeapQueue, 'calendar': CalendarQueue}
+
+def make_queue(kind='heap'):
+    """
+    Create an empty event queue.
+
+    Args:
+        kind (str): One of 'heap' or 'calendar'.
+
+    Returns:
+        HeapQueue or CalendarQueue: The queue.
+    """
+    return QUEUES[kind]()
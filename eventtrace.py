@@ -0,0 +1,187 @@
+import os
+import argparse
+import numpy as np
+
+# kinds of trace records
+MINED, RECEIVED, ACCEPTED, TXN_CREATED, TXN_RECEIVED = range(5)
+KIND_NAMES = ["Mined", "Received", "Accepted", "TxnCreated", "TxnReceived"]
+
+# one record per event, id is a blk_id or a txnId, parent and count (txns in the block) are only set for Mined
+TRACE_DTYPE = np.dtype([('time', '<f8'), ('kind', 'u1'), ('peer', '<i4'), ('id', '<i8'),
+                        ('parent', '<i4'), ('count', '<i4')])
+MAGIC = b'P2PTRACE'
+VERSION = 1
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('itemsize', '<u4'), ('peers', '<u4')])
+# number of records kept in memory before they are appended to the file
+BUFFER_SIZE = 1 << 16
+
+class TraceWriter:
+    """
+    Append-only binary trace of the block and transaction events of a run.
+
+    Records are buffered and appended to the file in chunks of TRACE_DTYPE records after
+    a short header. A writer can be pickled with its simulation: the buffer is flushed and
+    the unpickled writer truncates the file to the pickled length and appends from there,
+    so a resumed run writes the same trace as an uninterrupted one.
+
+    Attributes:
+        path (str): Path of the trace file.
+        transactions (bool): Whether transaction events are recorded.
+        rows (list): Records not written yet.
+    """
+    def __init__(self, path, n_peers, transactions=False, buffer_size=BUFFER_SIZE):
+        """
+        Initialize a TraceWriter instance, creating the file.
+
+        Args:
+            path (str): Path of the trace file.
+            n_peers (int): Number of peers of the simulation.
+            transactions (bool): Whether to record transaction events as well as block events.
+            buffer_size (int): Number of records kept in memory before they are written.
+        """
+        self.path = path
+        self.transactions = transactions
+        self.buffer_size = buffer_size
+        self.rows = []
+        self.file = open(path, 'wb')
+        np.array((MAGIC, VERSION, TRACE_DTYPE.itemsize, n_peers), dtype=HEADER).tofile(self.file)
+
+    def record(self, kind, time, peer, id, parent=-1, count=-1):
+        """
+        Add a record to the trace.
+
+        Args:
+            kind (int): One of MINED, RECEIVED, ACCEPTED, TXN_CREATED and TXN_RECEIVED.
+            time (float): Time of the event.
+            peer (int): ID of the peer, the miner for MINED.
+            id (int): blk_id or txnId.
+            parent (int): blk_id of the parent, for MINED.
+            count (int): Number of txns in the block, for MINED.
+        """
+        self.rows.append((time, kind, peer, id, parent, count))
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records to the file.
+        """
+        if self.rows:
+            np.array(self.rows, dtype=TRACE_DTYPE).tofile(self.file)
+            self.rows = []
+        self.file.flush()
+
+    def close(self):
+        """
+        Write the buffered records and close the file.
+        """
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __getstate__(self):
+        if not self.file.closed:
+            self.flush()
+        return {'path': self.path, 'transactions': self.transactions, 'buffer_size': self.buffer_size,
+                'length': os.path.getsize(self.path)}
+
+    def __setstate__(self, state):
+        self.path = state['path']
+        self.transactions = state['transactions']
+        self.buffer_size = state['buffer_size']
+        self.rows = []
+        self.file = open(self.path, 'r+b')
+        self.file.truncate(state['length'])
+        self.file.seek(state['length'])
+
+def read_trace(path):
+    """
+    Memory-map a trace file.
+
+    Args:
+        path (str): Path of the trace file.
+
+    Returns:
+        tuple: (n_peers, records), the number of peers of the simulation and a structured
+        array of TRACE_DTYPE records in the order they were written.
+    """
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) == 0 or header['magic'][0] != MAGIC:
+        raise ValueError(f"{path} is not a trace file")
+    if header['version'][0] != VERSION or header['itemsize'][0] != TRACE_DTYPE.itemsize:
+        raise ValueError(f"{path} has trace version {header['version'][0]}, expected {VERSION}")
+    n_peers = int(header['peers'][0])
+    if os.path.getsize(path) == HEADER.itemsize:
+        return n_peers, np.zeros(0, dtype=TRACE_DTYPE)
+    return n_peers, np.memmap(path, dtype=TRACE_DTYPE, mode='r', offset=HEADER.itemsize)
+
+def log_heading(peer_id):
+    """
+    Format the first line of the log of a peer.
+
+    Args:
+        peer_id (int): ID of the peer.
+
+    Returns:
+        str: The line, with its newline.
+    """
+    return f'Data For Node Id: {peer_id}\n'
+
+def log_line(blk_id, parent, miner, txns, time):
+    """
+    Format the line of a block in the log of a peer.
+
+    main.write_logs and write_logs both use it, so logs written during a run and
+    logs regenerated from its trace are the same.
+
+    Args:
+        blk_id (int): ID of the block.
+        parent (int): blk_id of the parent, None for the genesis block.
+        miner (int): peer_id of the miner, None for the genesis block.
+        txns (int): Number of txns in the block.
+        time (float): Time the peer accepted the block.
+
+    Returns:
+        str: The line, with its newline.
+    """
+    return f"Block Id:{blk_id}, Parent ID:{parent}, Miner ID:{miner}, Txns:{txns}, Time:{time}\n"
+
+def write_logs(records, n, directory='./logs'):
+    """
+    Write the blockchain of each peer to {directory}/log_tree_{peer_id}.txt, from a trace.
+
+    Args:
+        records (numpy.ndarray): Trace records, as returned by read_trace, starting with the genesis block.
+        n (int): Number of peers.
+        directory (str): Directory of the logs.
+    """
+    mined = records[records['kind'] == MINED]
+    parent = dict(zip(mined['id'].tolist(), mined['parent'].tolist()))
+    miner = dict(zip(mined['id'].tolist(), mined['peer'].tolist()))
+    count = dict(zip(mined['id'].tolist(), mined['count'].tolist()))
+    genesis_time = mined['time'][mined['id'] == 1][0]
+
+    accepted = records[records['kind'] == ACCEPTED]
+    accepted = accepted[np.lexsort((accepted['id'], accepted['time'], accepted['peer']))]
+    starts = np.searchsorted(accepted['peer'], np.arange(n + 1))
+    for peer_id in range(n):
+        with open(os.path.join(directory, f'log_tree_{peer_id}.txt'), 'w+') as file:
+            file.write(log_heading(peer_id))
+            file.write(log_line(1, None, None, count[1], genesis_time))
+            for record in accepted[starts[peer_id]:starts[peer_id + 1]]:
+                blk_id = int(record['id'])
+                file.write(log_line(blk_id, parent[blk_id], miner[blk_id], count[blk_id], record['time']))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a trace and regenerate the text logs from it")
+    parser.add_argument("trace", type=str, help="Path of the trace file")
+    parser.add_argument("--logs", type=str, default=None, help="Write the per-peer text logs to this directory")
+    args = parser.parse_args()
+
+    n_peers, records = read_trace(args.trace)
+    print(f"Peers: {n_peers}")
+    for kind, name in enumerate(KIND_NAMES):
+        print(f"{name}: {int(np.count_nonzero(records['kind'] == kind))}")
+    if args.logs:
+        os.makedirs(args.logs, exist_ok=True)
+        write_logs(records, n_peers, args.logs)
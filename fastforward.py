@@ -0,0 +1,120 @@
+from bisect import bisect_right
+import numpy as np
+
+from txnstore import TXN_SIZE
+from eventtrace import TXN_RECEIVED
+
+def delay_matrix(links, size=TXN_SIZE):
+    """
+    Compute the shortest-path delay of a message between every two peers.
+
+    Each link costs its mean latency: propagation delay, transmission time and mean
+    queuing delay. Links are symmetric, so the matrix is too. Distances are relaxed
+    over all sources at once, one numpy pass per neighbour slot, until no path gets
+    shorter, which takes as many rounds as the most hops on a shortest path.
+
+    Args:
+        links (LinkModel): Latency model of the links.
+        size (float): Size of the message.
+
+    Returns:
+        numpy.ndarray: n x n float32 matrix of delays, inf between disconnected peers.
+    """
+    n = len(links.rho)
+    degree = max((len(rho) for rho in links.rho), default=0)
+    # neighbour slots padded with the peer itself at infinite cost
+    neighbours = np.tile(np.arange(n)[:, None], (1, degree))
+    weights = np.full((n, degree), np.inf, dtype=np.float32)
+    for peer_id, (rho, inv_bandwidth, queue_mean) in enumerate(zip(links.rho, links.inv_bandwidth, links.queue_mean)):
+        count = len(rho)
+        neighbours[peer_id, :count] = list(links.neighbour_index[peer_id])
+        weights[peer_id, :count] = rho + size * inv_bandwidth + queue_mean
+
+    dist = np.full((n, n), np.inf, dtype=np.float32)
+    np.fill_diagonal(dist, 0)
+    while True:
+        relaxed = dist.copy()
+        for k in range(degree):
+            np.minimum(relaxed, dist[:, neighbours[:, k]] + weights[:, k], out=relaxed)
+        if np.array_equal(relaxed, dist):
+            return dist
+        dist = relaxed
+
+class TxnArrivals:
+    """
+    Transaction gossip modelled analytically: a txn reaches each peer after the
+    shortest-path delay from its creator, without an event per hop.
+
+    Created txns are logged in time order. A peer is brought up to date lazily, with
+    sync, before it uses its received or pending txns, so it sees every txn whose
+    arrival time has passed, checked against its chain as of the sync. Only the txns
+    created since the oldest one that has not reached the peer yet are checked again.
+
+    Attributes:
+        sim (Simulation): The simulation.
+        delays (numpy.ndarray): Shortest-path delay between every two peers.
+        ids (list): txnId of each created txn, in creation order.
+        origins (list): peer_id of the creator of each txn.
+        times (list): Creation time of each txn.
+        cursor (list): Per peer, number of logged txns known to have reached it.
+    """
+    def __init__(self, sim):
+        """
+        Initialize a TxnArrivals instance, computing the delay matrix.
+
+        Args:
+            sim (Simulation): The simulation, with its links built.
+        """
+        self.sim = sim
+        self.delays = delay_matrix(sim.links)
+        self.ids = []
+        self.origins = []
+        self.times = []
+        self.cursor = [0] * sim.n
+
+    def publish(self, txn, origin, time):
+        """
+        Log a txn sent by its creator.
+
+        Args:
+            txn (int): txnId of the txn.
+            origin (int): peer_id of the creator.
+            time (float): Creation time, no earlier than that of the previous txn.
+        """
+        self.ids.append(txn)
+        self.origins.append(origin)
+        self.times.append(time)
+
+    def sync(self, peer, time):
+        """
+        Receive the txns that reached a peer by a given time, as txnRecv would have.
+
+        Args:
+            peer (Peer): The peer.
+            time (float): Current time.
+        """
+        start = self.cursor[peer.peer_id]
+        end = bisect_right(self.times, time, start)
+        if start == end:
+            return
+        ids = np.array(self.ids[start:end], dtype=np.int64)
+        arrival = np.array(self.times[start:end]) + self.delays[peer.peer_id, self.origins[start:end]]
+        arrived = arrival <= time
+        waiting = np.flatnonzero(~arrived)
+        self.cursor[peer.peer_id] = start + (waiting[0] if len(waiting) else len(ids))
+
+        new = arrived & ~peer.txnReceived.contains(ids)
+        ids, arrival = ids[new], arrival[new]
+        if len(ids) == 0:
+            return
+        peer.txnReceived.update(ids)
+        # txns in no block at all are not in the chain either
+        indexed = self.sim.txns.block[ids] != 0
+        peer.pendingTxns.update(ids[~indexed])
+        for txn in ids[indexed].tolist():
+            if not peer.chainIncludes(txn):
+                peer.pendingTxns.add(txn)
+        trace = self.sim.txn_trace
+        if trace is not None:
+            for txn, received in zip(ids.tolist(), arrival.tolist()):
+                trace.record(TXN_RECEIVED, received, peer.peer_id, txn)
@@ -1,27 +1,35 @@
-import heapq
+# event type codes, used to index the dispatch table of the simulation
+(TXN_GEN, TXN_RECV, BLOCK_RECV, BLOCK_MINED, TXN_INV, TXN_GETDATA, TXN_BATCH, INV_FLUSH,
+ CMPCT_BLOCK, GET_BLOCK_TXN, BLOCK_TXN) = range(11)
+EVENT_NAMES = ["TxnGen", "TxnRecv", "BlockRecv", "BlockMined", "TxnInv", "TxnGetData", "TxnBatch", "InvFlush",
+               "CmpctBlock", "GetBlockTxn", "BlockTxn"]
 
 class Handler:
     """
     Represents an event handler for managing events in the simulation.
 
     Attributes:
-        type (str): The type of event.
+        type (int): The type code of the event.
         time_occurred (float): The time at which the event occurred.
-        txn (Transaction): The transaction associated with the event.
-        blk (Block): The block associated with the event.
-        sender (Peer): The sender peer associated with the event.
+        txn (int): txnId of the transaction associated with the event, a list of them for inv gossip and
+            compact block messages.
+        blk (Block): The block associated with the event, the block mined on for BlockMined.
+        sender (Peer): The sender peer associated with the event, the miner for BlockMined and
+            the creator for TxnGen. The peer_id of the sender for txn messages.
         receiver (Peer): The receiver peer associated with the event.
     """
+    __slots__ = ('type', 'time_occured', 'txn', 'blk', 'sender', 'receiver')
+
     def __init__(self, type, time_occured, sender=None, receiver=None, txn=None, blk=None):
         """
         Initialize a Handler instance.
 
         Args:
-            type (str): The type of event.
+            type (int): The type code of the event.
             time_occurred (float): The time at which the event occurred.
             sender (Peer): The sender peer associated with the event. Default is None.
             receiver (Peer): The receiver peer associated with the event. Default is None.
-            txn (Transaction): The transaction associated with the event. Default is None.
+            txn (int): txnId of the transaction associated with the event. Default is None.
             blk (Block): The block associated with the event. Default is None.
         """
         self.type = type
@@ -30,14 +38,3 @@ class Handler:
         self.blk = blk
         self.sender = sender
         self.receiver = receiver
-
-def enqueue(handler):
-    """
-    Enqueue a handler into the event handler queue.
-
-    Args:
-        handler (Handler): The handler to be enqueued.
-    """
-    heapq.heappush(handler_queue, (handler.time_occured, handler))
-
-handler_queue = []
\ No newline at end of file
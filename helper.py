@@ -1,21 +1,23 @@
 import numpy as np
-# Initialize a random number generator with a specific seed
-rng = np.random.default_rng(69)
+# Default seed of the random number generators
+SEED = 69
 
-# Initialize a random number generator with a specific seed
-
-blk_create_ctr = 0
-def blk_incre():
-    """
-    Increment the block creation counter.
+def rng_streams(seed, n_peers):
     """
-    globals()['blk_create_ctr'] += 1
+    Create the independent random number generators of a simulation.
 
-def get_blks():
-    """
-    Get the current value of the block creation counter.
+    Mining, link latencies and the transactions of each peer draw from separate
+    streams spawned from one seed, so changing how one part of the model uses its
+    random numbers leaves the sequences of the others unchanged.
+
+    Args:
+        seed (int): Seed of the simulation.
+        n_peers (int): Number of peers.
 
     Returns:
-        int: The current value of the block creation counter.
+        tuple: (mining, link, txns), generators for block mining times and contents,
+        for link delays, and a list with the transaction generator of each peer.
     """
-    return globals()['blk_create_ctr']
\ No newline at end of file
+    mining, link, txns = np.random.SeedSequence(seed).spawn(3)
+    return (np.random.default_rng(mining), np.random.default_rng(link),
+            [np.random.default_rng(stream) for stream in txns.spawn(n_peers)])
@@ -0,0 +1,147 @@
+import csv
+import json
+import math
+from time import perf_counter
+
+from handler import EVENT_NAMES
+from simulation import DISPATCH
+
+# simulated time between two samples of the queue depth
+SAMPLE_INTERVAL = 100
+
+class Instrumentation:
+    """
+    Event counts, handler times, block building and queue depth of an instrumented run.
+
+    Events are timed around their dispatch, so the time of an event type is that of its
+    Peer handler: txnSend for TxnGen, txnRecv for TxnRecv, verifyAndAddReceivedBlock for
+    BlockRecv and receiveSelfMinedBlock for BlockMined. buildBlock is called from
+    receiveSelfMinedBlock and is also timed on its own. Simulation.run picks the timed
+    dispatch table once, before its loop, so a run without instrumentation only pays a
+    None check per buildBlock call.
+
+    Attributes:
+        counts (list): Number of events handled per type code.
+        seconds (list): Wall time spent handling events per type code.
+        mine_calls (int): Number of buildBlock calls.
+        mine_candidates (int): Pending txns considered by buildBlock, over all calls.
+        mine_selected (int): Txns selected into the built blocks, over all calls, besides the coinbase txns.
+        max_candidates (int): Most pending txns considered by one buildBlock call.
+        mine_seconds (float): Wall time spent in buildBlock.
+        queue_depth (list): (simulated time, number of pending events) samples, taken at handled events.
+        next_sample (float): Simulated time of the next queue depth sample.
+        dispatch (tuple): Timed handler of each event type, used by Simulation.run instead of DISPATCH.
+        wall_time (float): Wall time of the run.
+    """
+    def __init__(self, sim, sample_interval=SAMPLE_INTERVAL):
+        """
+        Initialize an Instrumentation instance and attach it to a simulation.
+
+        Args:
+            sim (Simulation): The simulation, new or loaded from a checkpoint.
+            sample_interval (float): Simulated time between two samples of the queue depth.
+        """
+        self.sim = sim
+        self.sample_interval = sample_interval
+        self.counts = [0] * len(DISPATCH)
+        self.seconds = [0.0] * len(DISPATCH)
+        self.mine_calls = 0
+        self.mine_candidates = 0
+        self.mine_selected = 0
+        self.max_candidates = 0
+        self.mine_seconds = 0.0
+        self.queue_depth = []
+        self.next_sample = 0
+        self.dispatch = tuple(self._timed(code, handler) for code, handler in enumerate(DISPATCH))
+        self.wall_time = 0.0
+        sim.instrument = self
+
+    def _timed(self, code, handler):
+        counts, seconds = self.counts, self.seconds
+        def timed(event):
+            if event.time_occured >= self.next_sample:
+                self._sample(event.time_occured)
+            start = perf_counter()
+            handler(event)
+            seconds[code] += perf_counter() - start
+            counts[code] += 1
+        return timed
+
+    def _sample(self, time):
+        # the event being handled was already popped
+        self.queue_depth.append((time, len(self.sim.handler_queue) + 1))
+        self.next_sample = (math.floor(time / self.sample_interval) + 1) * self.sample_interval
+
+    def record_mining(self, candidates, selected, seconds):
+        """
+        Record a buildBlock call.
+
+        Args:
+            candidates (int): Number of pending txns considered.
+            selected (int): Number of txns selected into the block, besides the coinbase txn.
+            seconds (float): Wall time of the call.
+        """
+        self.mine_calls += 1
+        self.mine_candidates += candidates
+        self.mine_selected += selected
+        self.max_candidates = max(self.max_candidates, candidates)
+        self.mine_seconds += seconds
+
+    def run(self, checkpoint_interval=None, checkpoint_path='checkpoint.pkl'):
+        """
+        Run the simulation with Simulation.run, recording every handled event.
+
+        Args:
+            checkpoint_interval (float): Simulated time between two checkpoints, None for no checkpoints.
+            checkpoint_path (str): Path of the checkpoints, as for Simulation.run.
+        """
+        started = perf_counter()
+        self.sim.run(checkpoint_interval=checkpoint_interval, checkpoint_path=checkpoint_path)
+        self.wall_time = perf_counter() - started
+
+    def report(self):
+        """
+        Get the collected measurements.
+
+        Returns:
+            dict: Measurements with keys 'wall_time', 'events' (count and seconds per event
+            name), 'mining', 'sample_interval' and 'queue_depth'.
+        """
+        return {
+            'wall_time': self.wall_time,
+            'events': {EVENT_NAMES[code]: {'count': count, 'seconds': self.seconds[code]}
+                       for code, count in enumerate(self.counts) if count},
+            'mining': {
+                'calls': self.mine_calls,
+                'candidates': self.mine_candidates,
+                'selected': self.mine_selected,
+                'max_candidates': self.max_candidates,
+                'seconds': self.mine_seconds,
+            },
+            'sample_interval': self.sample_interval,
+            'queue_depth': self.queue_depth,
+        }
+
+    def write(self, path):
+        """
+        Write the measurements to a JSON file, or to a CSV file with (metric, key, value) rows
+        if the path ends with .csv.
+
+        Args:
+            path (str): Path of the file.
+        """
+        report = self.report()
+        with open(path, 'w', newline='') as file:
+            if not path.endswith('.csv'):
+                json.dump(report, file, indent=2)
+                return
+            writer = csv.writer(file)
+            writer.writerow(['metric', 'key', 'value'])
+            writer.writerow(['wall_time', '', report['wall_time']])
+            for name, event in report['events'].items():
+                writer.writerow(['count', name, event['count']])
+                writer.writerow(['seconds', name, event['seconds']])
+            for key, value in report['mining'].items():
+                writer.writerow(['mining', key, value])
+            for time, depth in report['queue_depth']:
+                writer.writerow(['queue_depth', time, depth])
@@ -0,0 +1,97 @@
+import numpy as np
+
+# minimum and maximum propagation delay of a link
+MIN_RHO, MAX_RHO = 10, 500
+# number of queuing delays drawn from the generator at once
+QUEUE_BUFFER_SIZE = 4096
+
+class LinkModel:
+    """
+    Latency model of the links of a network.
+
+    The propagation delay (rho) and the bandwidth of each link are fixed when the
+    model is built. Queuing delays are exponential with mean 96/bandwidth and are
+    taken from a buffer of standard exponentials that is refilled in batches.
+
+    Attributes:
+        rho (list): Propagation delay to each neighbour, one array per peer, in connected_peers order.
+        inv_bandwidth (list): Inverse bandwidth to each neighbour, one array per peer.
+        queue_mean (list): Mean queuing delay to each neighbour, one array per peer.
+        neighbour_index (list): Position of each neighbour in the arrays above, one dict per peer.
+    """
+    def __init__(self, peers, edges, rng, buffer_size=QUEUE_BUFFER_SIZE):
+        """
+        Initialize a LinkModel instance.
+
+        Args:
+            peers (list): List of Peer objects, already connected to their neighbours.
+            edges (list): List of edges representing connections.
+            rng (numpy.random.Generator): Generator for the propagation and queuing delays.
+            buffer_size (int): Number of queuing delays drawn at once.
+        """
+        self.rng = rng
+        self.buffer_size = buffer_size
+        self.buffer = np.empty(0)
+        self.pos = 0
+
+        edges = list(edges)
+        edge_rho = dict()
+        for (u, v), rho in zip(edges, rng.uniform(MIN_RHO, MAX_RHO, len(edges))):
+            edge_rho[u, v] = edge_rho[v, u] = rho
+
+        self.rho, self.inv_bandwidth, self.queue_mean, self.neighbour_index = [], [], [], []
+        for peer in peers:
+            neighbours = peer.connected_peers
+            inv_bandwidth = np.array([1 / (5 if peer.is_slow or nbr.is_slow else 100) for nbr in neighbours])
+            self.rho.append(np.array([edge_rho[peer.peer_id, nbr.peer_id] for nbr in neighbours]))
+            self.inv_bandwidth.append(inv_bandwidth)
+            self.queue_mean.append(96 * inv_bandwidth)
+            self.neighbour_index.append({nbr.peer_id: k for k, nbr in enumerate(neighbours)})
+
+    def queuing_delays(self, count):
+        """
+        Take standard exponential samples from the buffer, refilling it if needed.
+
+        Args:
+            count (int): Number of samples.
+
+        Returns:
+            numpy.ndarray: The samples.
+        """
+        if self.pos + count > len(self.buffer):
+            self.buffer = self.rng.standard_exponential(max(self.buffer_size, count))
+            self.pos = 0
+        self.pos += count
+        return self.buffer[self.pos - count:self.pos]
+
+    def latency(self, sender_id, receiver_id, size = 1):
+        """
+        Compute the latency of one message over a link.
+
+        Args:
+            sender_id (int): ID of the sending peer.
+            receiver_id (int): ID of the receiving peer, a neighbour of the sender.
+            size (int): Size of the message.
+
+        Returns:
+            float: The latency.
+        """
+        k = self.neighbour_index[sender_id][receiver_id]
+        return float(self.rho[sender_id][k] + size * self.inv_bandwidth[sender_id][k]
+                     + self.queue_mean[sender_id][k] * self.queuing_delays(1)[0])
+
+    def arrivals(self, sender_id, time, size = 1):
+        """
+        Compute the arrival times of a message sent to all neighbours of a peer.
+
+        Args:
+            sender_id (int): ID of the sending peer.
+            time (float): Time at which the message is sent.
+            size (int): Size of the message.
+
+        Returns:
+            list: Arrival time at each neighbour, in connected_peers order.
+        """
+        queue_mean = self.queue_mean[sender_id]
+        delays = self.rho[sender_id] + size * self.inv_bandwidth[sender_id] + queue_mean * self.queuing_delays(len(queue_mean))
+        return (delays + time).tolist()
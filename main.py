@@ -1,133 +1,51 @@
 import os
-import heapq
-import random
+import sys
 import shutil
 import argparse
-import numpy as np
 import networkx as nx
 import matplotlib.pyplot as plt
 
-from transaction import Transaction
-from block import Block
-from peer import Peer
-from helper import get_blks, rng
-from handler import handler_queue, Handler
-
-
-# Handle events 
-def handle(event): #event handler 
-    """
-    Handle events based on their types.
-
-    Args:
-        event (Handler): The event to be handled.
-    """
-    if event.type == "TxnGen":
-        event.txn.sender.txnSend(event)
-    elif event.type == "TxnRecv":
-        event.receiver.txnRecv(event)
-    elif event.type == "BlockRecv":
-        event.receiver.verifyAndAddReceivedBlock(event)
-    elif event.type == "BlockMined":
-        event.blk.miner.receiveSelfMinedBlock(event)
-
-# plot
-def visualize_blockchain(peer_id):
-    """
-    Visualize the blockchain of a peer and save the plot as an image.
-
-    Args:
-        peer_id (int): The ID of the peer.
-    """
-    plt.figure()
-    # draw network with Kamada Kawai layout
-    nx.draw(peers_net[peer_id].g, pos=nx.kamada_kawai_layout(peers_net[peer_id].g), node_size=10, node_color='red')
-    plt.savefig(f'./figures/blockchain_{peer_id}.png')
+from helper import SEED
+from orphan import MAX_ORPHANS
+from peer import INV_INTERVAL
+from simulation import Simulation
+from pdes import ParallelSimulation
+from topology import TOPOLOGIES
+from instrument import Instrumentation
+from stats import print_network_stats
+from memory import memory_report, print_memory_report
+from render import parse_peers, render_blockchains
+from eventtrace import log_heading, log_line
+
+# the network figure is drawn with a spring layout, which takes minutes past a few thousand peers,
+# so by default it is only drawn up to this many peers
+NETWORK_FIGURE_MAX_PEERS = 500
 
 # save plot
-def print_graph(): #print graph     
+def print_graph(G): #print graph
     plt.figure()
     nx.draw(G, with_labels=True)
     plt.savefig('./figures/network_graph.png')
+    plt.close()
 
-def print_network_stats():
-    network_node = peers_net[0]
-    genesis_block_id = 1
-
-    reversed_graph = network_node.g.reverse()
-    successors = nx.dfs_successors(reversed_graph, source=genesis_block_id)
-    depth_map = {}
-    max_depth_map = {}
-    parent_map = {}
-    deepest_node_id = genesis_block_id
-
-    def depth_first_search(node_id, parent_id=None, depth=0):
-        nonlocal deepest_node_id
-        depth_map[node_id] = depth
-        max_depth_map[node_id] = depth
-        parent_map[node_id] = parent_id
-        if depth > depth_map[deepest_node_id]:
-            deepest_node_id = node_id
-        if node_id not in successors:
-            return
-        for child_id in successors[node_id]:
-            depth_first_search(child_id, node_id, depth + 1)
-            max_depth_map[node_id] = max(max_depth_map[node_id], max_depth_map[child_id])
-
-    depth_first_search(genesis_block_id)
-
-    branch_lengths = []
-    current_node = deepest_node_id
-    while current_node != genesis_block_id:
-        child_node = current_node
-        current_node = parent_map[current_node]
-        for sibling_id in successors.get(current_node, []):
-            if sibling_id != child_node:
-                branch_lengths.append(max_depth_map[sibling_id] - depth_map[current_node])
-
-    # Initialize dictionaries to store statistics
-    node_type_performance = {node_type: {'successful': 0, 'blocks_mined': 0} for node_type in ['slow_low', 'slow_high', 'fast_low', 'fast_high']}
-    blocks_in_longest_chain = {peer.peer_id: 0 for peer in peers_net}
-
-    # Aggregate statistics for each peer
-    for peer in peers_net:
-        peer_type = f"{'slow' if peer.is_slow else 'fast'}_{'low' if peer.is_low_cpu else 'high'}"
-        node_type_performance[peer_type]['blocks_mined'] += peer.created_blocks_own
-
-    block = network_node.blockChain[network_node.last_blk_id]
-    while block.blk_id != genesis_block_id:
-        blocks_in_longest_chain[block.miner.peer_id] += 1
-        miner_type = f"{'slow' if block.miner.is_slow else 'fast'}_{'low' if block.miner.is_low_cpu else 'high'}"
-        node_type_performance[miner_type]['successful'] += 1
-        block = block.parent_blk
-
-    # Print statistics
-    print("Length of longest chain (including genesis block):", network_node.blockChain[network_node.last_blk_id].chain_length)
-    print("Total number of blocks mined:", sum(peer.created_blocks_own for peer in peers_net))
-    print("Fraction of mined blocks present in longest chain:", round((network_node.blockChain[network_node.last_blk_id].chain_length - 1) / sum(peer.created_blocks_own for peer in peers_net), 3))
-    print()
-    
-    for node_type, stats in node_type_performance.items():
-        if (network_node.blockChain[network_node.last_blk_id].chain_length - 1) > 0:
-            print(f"% blocks in longest chain mined by {node_type} node:", round(stats['successful'] / (network_node.blockChain[network_node.last_blk_id].chain_length - 1), 2))
-        else:
-            print(f"% blocks in longest chain mined by {node_type} node: N/A")
-    print()
-    
-    for node_type, stats in node_type_performance.items():
-        if stats['blocks_mined'] > 0:
-            print(f"% blocks mined by {node_type} node that made it to longest chain:", round(stats['successful'] / stats['blocks_mined'], 2))
-        else:
-            print(f"% blocks mined by {node_type} node that made it to longest chain: N/A")
-    print()
-    
-    if branch_lengths:
-        print("Lengths of branches:", branch_lengths)
-        print("Average length of branch:", round(np.average(branch_lengths), 3))
-    else:
-        print("No branches were formed!")
-
+def write_logs(tree, n):
+    """
+    Write the blockchain of each peer to ./logs/log_tree_{peer_id}.txt.
 
+    Args:
+        tree (BlockTree): The block tree of the simulation.
+        n (int): Number of peers.
+    """
+    for peer_id in range(n): #each node
+            file = open(f'./logs/log_tree_{peer_id}.txt', 'w+') #store in file
+            file.write(log_heading(peer_id))
+            for blk_id in tree.accepted(peer_id).tolist(): #each block
+                parent, miner = None, None
+                if blk_id != 1: #if parent and miner exists
+                    parent = int(tree.parent[blk_id])
+                    miner = int(tree.miner[blk_id])
+                file.write(log_line(blk_id, parent, miner, len(tree.blocks[blk_id].txn_in_blk), tree.time[peer_id, blk_id]))
+            file.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Initiate P2P Network")
@@ -135,9 +53,37 @@ if __name__ == "__main__":
     parser.add_argument("--z0", type=float, default=10, help="Percentage of slow peers")
     parser.add_argument("--z1", type=float, default=40, help="Percentage of low CPU peers")
     parser.add_argument("--txn-mean", type=float, default=8, help="Interarrival time between transactions")
+    parser.add_argument("--simulation-time", type=float, default=10000, help="Time until which events are generated")
+    parser.add_argument("--seed", type=int, default=SEED, help="Seed of the random number generators")
+    parser.add_argument("--topology", choices=list(TOPOLOGIES), default="bounded", help="Generator of the network topology")
+    parser.add_argument("--queue", choices=["heap", "calendar"], default="heap", help="Event queue backend")
+    parser.add_argument("--max-orphans", type=int, default=MAX_ORPHANS, help="Maximum number of orphan blocks kept by each peer")
+    parser.add_argument("--gossip", choices=["flood", "inv", "analytic"], default="flood", help="Transaction relay: flood full txns, announce and send on request, or deliver after the shortest-path delay without per-hop events")
+    parser.add_argument("--inv-interval", type=float, default=INV_INTERVAL, help="Time between the announcements of a peer with inv gossip")
+    parser.add_argument("--block-relay", choices=["full", "compact"], default="full", help="Block relay: whole blocks or compact blocks")
+    parser.add_argument("--instrument", type=str, default=None, help="Record event counts, handler times, block building and queue depth to this JSON or CSV file")
+    parser.add_argument("--trace", type=str, default=None, help="Write a binary trace of the block events to this file")
+    parser.add_argument("--trace-txns", action="store_true", help="Also trace transaction events")
+    parser.add_argument("--checkpoint-interval", type=float, default=None, help="Save the simulation every this much simulated time")
+    parser.add_argument("--checkpoint", type=str, default="checkpoint.pkl", help="Path of the checkpoints, '{time:.0f}' in it is replaced by the time of each one")
+    parser.add_argument("--resume", type=str, default=None, help="Continue the simulation saved in this checkpoint, ignoring the other simulation options")
+    parser.add_argument("--network-figure", choices=["auto", "yes", "no"], default="auto", help=f"Draw the topology to figures/network_graph.png: always, never, or only up to {NETWORK_FIGURE_MAX_PEERS} peers")
+    parser.add_argument("--plot-peers", type=str, default="all", help="Peers whose blockchain is drawn: 'all', 'none' or IDs and ranges such as '0,3,10-19'")
+    parser.add_argument("--render-workers", type=int, default=None, help="Processes drawing the blockchains, all cores by default")
+    parser.add_argument("--partitions", type=int, default=1, help="Split the peers among this many worker processes, printing only the network statistics")
+    parser.add_argument("--memory-report", action="store_true", help="Print memory per transaction, block and pending event")
     args = parser.parse_args()
-    # env = simpy.Environment()
-    simulation_time=10000
+
+    if args.partitions > 1:
+        # the block tree is split among the workers, so there are no logs or blockchain figures
+        psim = ParallelSimulation(parts=args.partitions, n=args.n, z0=args.z0, z1=args.z1, txn_mean=args.txn_mean,
+                                  simulation_time=args.simulation_time, seed=args.seed, queue=args.queue,
+                                  max_orphans=args.max_orphans, gossip=args.gossip,
+                                  inv_interval=args.inv_interval, block_relay=args.block_relay,
+                                  topology=args.topology)
+        psim.run()
+        print_network_stats(psim.summary())
+        sys.exit()
 
     if os.path.exists('./logs'): shutil.rmtree('./logs')
     os.mkdir('./logs')
@@ -145,88 +91,34 @@ if __name__ == "__main__":
     if os.path.exists('./figures'): shutil.rmtree('./figures')
     os.mkdir('./figures')
 
-    n, z0, z1, txn_mean = args.n, args.z0, args.z1, args.txn_mean
-
-    G = nx.Graph()
-    G.add_nodes_from(range(n))
-    
-    genesis_block = Block(parent_blk=0, txn_in_blk=set(), miner=None, balance=[1000]*n)    
-    
-    z0, z1 = z0/100.0, z1/100.0
-
-    # genesis block
-    genesis = Block(parent_blk = 0, miner=None, balance = [1000]*n)
-
-    # CPU specs
-    slow_selec = random.sample(range(n), int(z0*n))
-    low_cpu_selec = random.sample(range(n), int(z1*n))
-
-    # hashing power
-    invh0 = n*(10 - 9*z1)
-    invh1 = invh0/10
-    I = 1000
-
-    peers_net = []
-    for i in range(n):
-        is_slow = i in slow_selec
-        is_low_cpu = i in low_cpu_selec
-        miningTime = I*invh0 if is_slow else I*invh1
-        p = Peer(is_slow = is_slow, is_low_cpu = is_low_cpu, genesis=genesis, miningTime=miningTime)
-        peers_net.append(p)
-
-    
-    n = len(peers_net)
-    graph = nx.connected_watts_strogatz_graph(n, k = random.randint(3, 6), p = 0.5)
-    while not all(3 <= degree <= 6 for _, degree in graph.degree()):
-        graph = nx.connected_watts_strogatz_graph(n, k = random.randint(3, 6), p = 0.5)
-    
-    for peer in peers_net:
-        peer.connect_to_peers(peers_net, graph.edges()) 
-
-    for e1, e2 in graph.edges():
-        G.add_edge(e1, e2)   
-    
-    print_graph()
-
-    for peer in peers_net:
-        minetime = rng.exponential(peer.miningTime)
-        block2mine = Block(miner = peer, parent_blk=genesis,txn_in_blk={Transaction(receiver=peer, coins=50, coinbase=True)})
-
-        # adding block event to the queue
-        heapq.heappush(handler_queue, (minetime, Handler("BlockMined", minetime, blk=block2mine)))
-        
-        # generate txn and add to the queue
-        t = rng.exponential(txn_mean)
-        while(t < simulation_time):
-            elem = Transaction(sender = peer, receiver = peers_net[rng.integers(len(peers_net))])
-            heapq.heappush(handler_queue, (t, Handler("TxnGen", t, txn=elem)))
-            t = t + rng.exponential(txn_mean)
-
-    time = 0
-    while(time < simulation_time and len(handler_queue) > 0):
-        time, event = heapq.heappop(handler_queue)
-        handle(event)
-    while(len(handler_queue) > 0):
-        time, event = heapq.heappop(handler_queue)
-        if event.type in ["TxnRecv", "BlockRecv"]:
-            handle(event)
-
-
-    for peer in peers_net: #each node
-            file = open(f'./logs/log_tree_{peer.peer_id}.txt', 'w+') #store in file
-            heading = f'Data For Node Id: {peer.peer_id}\n'
-            file.write(heading)
-            for _, block in peer.blockChain.items(): #each block
-                parent, miner = None, None
-                if block.parent_blk != 0: #if parent and miner exists
-                    parent = block.parent_blk.blk_id
-                    miner = block.miner.peer_id
-                log_to_write = f"Block Id:{block.blk_id}, Parent ID:{parent}, Miner ID:{miner}, Txns:{len(block.txn_in_blk)}, Time:{peer.blockTime[block.blk_id]}\n"
-                file.write(log_to_write)
-            file.close()
+    if args.resume:
+        sim = Simulation.load_checkpoint(args.resume)
+    else:
+        sim = Simulation(n=args.n, z0=args.z0, z1=args.z1, txn_mean=args.txn_mean,
+                         simulation_time=args.simulation_time, seed=args.seed, queue=args.queue,
+                         max_orphans=args.max_orphans, gossip=args.gossip,
+                         inv_interval=args.inv_interval, block_relay=args.block_relay,
+                         trace_path=args.trace, trace_txns=args.trace_txns, topology=args.topology)
+
+    if args.network_figure == "yes" or (args.network_figure == "auto" and sim.n <= NETWORK_FIGURE_MAX_PEERS):
+        G = nx.Graph()
+        G.add_nodes_from(range(sim.n))
+        G.add_edges_from(sim.graph.edges())
+        print_graph(G)
+
+    if args.instrument:
+        instrument = Instrumentation(sim)
+        instrument.run(checkpoint_interval=args.checkpoint_interval, checkpoint_path=args.checkpoint)
+        instrument.write(args.instrument)
+    else:
+        sim.run(checkpoint_interval=args.checkpoint_interval, checkpoint_path=args.checkpoint)
+
+    write_logs(sim.tree, sim.n)
 
+    print_network_stats(sim.summary())
 
-    print_network_stats()
+    if args.memory_report:
+        print()
+        print_memory_report(memory_report(sim.peers, sim.tree, sim.txns))
 
-    for i in range(n):
-        visualize_blockchain(i)
\ No newline at end of file
+    render_blockchains(sim.tree, parse_peers(args.plot_peers, sim.n), workers=args.render_workers)
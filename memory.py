@@ -0,0 +1,93 @@
+import sys
+import resource
+import numpy as np
+
+from handler import Handler, TXN_RECV
+
+def transaction_bytes(txns, peers_net):
+    """
+    Get the memory held by the transactions: the columns of the store and the
+    received and pending bitsets of every peer.
+
+    Args:
+        txns (TxnStore): The transaction store.
+        peers_net (list): List of Peer objects.
+
+    Returns:
+        int: Size in bytes.
+    """
+    bitsets = sum(sys.getsizeof(txn_set.bits) + sys.getsizeof(txn_set.chunks)
+                  for peer in peers_net for txn_set in (peer.txnReceived, peer.pendingTxns))
+    index = sys.getsizeof(txns.more_blocks) + sum(map(sys.getsizeof, txns.more_blocks.values()))
+    return txns.nbytes() + index + bitsets
+
+def block_bytes(block):
+    """
+    Get the memory owned by a block, excluding the transactions it refers to.
+
+    Args:
+        block (Block): The block.
+
+    Returns:
+        int: Size in bytes of the object and the containers it owns.
+    """
+    size = sys.getsizeof(block) + sys.getsizeof(block.txn_in_blk) + sys.getsizeof(block.delta)
+    if block.checkpoint is not None:
+        size += sys.getsizeof(block.checkpoint)
+    return size
+
+def event_bytes():
+    """
+    Get the memory taken by one pending event in the queue.
+
+    Returns:
+        int: Size in bytes of a Handler, its (time, seq, item) queue entry and its time.
+    """
+    handler = Handler(TXN_RECV, 0.5)
+    return sys.getsizeof(handler) + sys.getsizeof((0.5, 1 << 20, handler)) + sys.getsizeof(0.5) + sys.getsizeof(1 << 20)
+
+def peak_rss():
+    """
+    Get the peak resident set size of the process.
+
+    Returns:
+        int: Peak RSS in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def memory_report(peers_net, tree, txns):
+    """
+    Measure the average memory per transaction, block and pending event of a run.
+
+    Args:
+        peers_net (list): List of Peer objects.
+        tree (BlockTree): The block tree of the simulation.
+        txns (TxnStore): The transaction store of the simulation.
+
+    Returns:
+        dict: Report with keys 'transactions', 'blocks', 'bytes_per_transaction',
+        'bytes_per_block', 'bytes_per_event' and 'peak_rss'.
+    """
+    blocks = {id(block): block for block in tree.blocks[1:] if block is not None}
+    count = int(np.count_nonzero(txns.sender >= 0))
+    return {
+        'transactions': count,
+        'blocks': len(blocks),
+        'bytes_per_transaction': transaction_bytes(txns, peers_net) / max(count, 1),
+        'bytes_per_block': sum(map(block_bytes, blocks.values())) / max(len(blocks), 1),
+        'bytes_per_event': event_bytes(),
+        'peak_rss': peak_rss(),
+    }
+
+def print_memory_report(report):
+    """
+    Print the report computed by memory_report.
+
+    Args:
+        report (dict): The memory report.
+    """
+    print(f"Bytes per transaction: {report['bytes_per_transaction']:.1f} ({report['transactions']} transactions)")
+    print(f"Bytes per block: {report['bytes_per_block']:.1f} ({report['blocks']} blocks)")
+    print(f"Bytes per pending event: {report['bytes_per_event']}")
+    print(f"Peak RSS: {report['peak_rss'] / 2**20:.1f} MiB")
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+# default number of orphan blocks a peer keeps
+MAX_ORPHANS = 1024
+
+class OrphanPool:
+    """
+    Blocks received before their parent, indexed by parent block ID.
+
+    The pool is bounded; when it is full the oldest orphan is evicted.
+
+    Attributes:
+        max_size (int): Maximum number of orphans kept.
+        hits (int): Number of orphans connected to the chain once their parent arrived.
+        evictions (int): Number of orphans evicted because the pool was full.
+    """
+    __slots__ = ('max_size', 'by_parent', 'blocks', 'hits', 'evictions')
+
+    def __init__(self, max_size=MAX_ORPHANS):
+        """
+        Initialize an empty OrphanPool.
+
+        Args:
+            max_size (int): Maximum number of orphans kept.
+        """
+        self.max_size = max_size
+        self.by_parent = dict() # parent blk_id -> list of orphan blocks
+        self.blocks = OrderedDict() # blk_id -> orphan block, oldest first
+        self.hits = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def __contains__(self, blk_id):
+        return blk_id in self.blocks
+
+    def add(self, block):
+        """
+        Add an orphan block, evicting the oldest orphans if the pool is full.
+
+        Args:
+            block (Block): The orphan block.
+
+        Returns:
+            list: The evicted blocks.
+        """
+        evicted = []
+        while len(self.blocks) >= self.max_size:
+            _, old = self.blocks.popitem(last=False)
+            siblings = self.by_parent[old.parent_blk.blk_id]
+            siblings.remove(old)
+            if not siblings:
+                del self.by_parent[old.parent_blk.blk_id]
+            evicted.append(old)
+        self.evictions += len(evicted)
+
+        self.blocks[block.blk_id] = block
+        self.by_parent.setdefault(block.parent_blk.blk_id, []).append(block)
+        return evicted
+
+    def pop_children(self, blk_id):
+        """
+        Remove and return the orphans whose parent is a given block.
+
+        Args:
+            blk_id (int): ID of the parent block.
+
+        Returns:
+            list: The orphan children, oldest first.
+        """
+        children = self.by_parent.pop(blk_id, [])
+        for child in children:
+            del self.blocks[child.blk_id]
+        self.hits += len(children)
+        return children
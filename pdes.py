@@ -0,0 +1,378 @@
+import math
+import multiprocessing
+from collections import deque
+import numpy as np
+
+from block import Block
+from blocktree import BlockTree
+from handler import Handler
+from link import MIN_RHO
+from simulation import Simulation, DISPATCH, IN_FLIGHT, drop
+from stats import ChainStats, network_stats
+
+def partition_peers(graph, n, parts):
+    """
+    Split the peers into connected-looking groups of about the same size.
+
+    Peers are ordered by a breadth-first search of the topology and the order is cut
+    into parts pieces, so most neighbours of a peer fall in its own partition.
+
+    Args:
+        graph (networkx.Graph): Topology of the network, with nodes 0 to n - 1.
+        n (int): Number of peers.
+        parts (int): Number of partitions.
+
+    Returns:
+        list: Partition of each peer.
+    """
+    order, seen = [], set()
+    for root in range(n):
+        if root in seen:
+            continue
+        seen.add(root)
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for neighbour in sorted(graph.adj.get(node, ())):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+    owner = [0] * n
+    for k, peer_id in enumerate(order):
+        owner[peer_id] = k * parts // n
+    return owner
+
+def lookahead(links, peers, owner):
+    """
+    Get the smallest latency of a message between two partitions.
+
+    Every message over a link takes at least its propagation delay, so no event sent
+    from one partition can reach another sooner than the smallest delay of a cut link.
+
+    Args:
+        links (LinkModel): Latency model of the links.
+        peers (list): List of Peer objects, connected to their neighbours.
+        owner (list): Partition of each peer.
+
+    Returns:
+        float: The lookahead, MIN_RHO if no link crosses partitions.
+    """
+    cut = [links.rho[peer.peer_id][k] for peer in peers for k, nbr in enumerate(peer.connected_peers)
+           if owner[nbr.peer_id] != owner[peer.peer_id]]
+    return float(min(cut)) if cut else float(MIN_RHO)
+
+class PartitionTree(BlockTree):
+    """
+    Block tree of one partition, holding the blocks its peers mined or received.
+
+    Blocks mined in partition p of P get the IDs 2 + p, 2 + P + p, 2 + 2P + p and so on,
+    so IDs are unique across partitions without coordination.
+    """
+    def __init__(self, n_peers, genesis, part, parts):
+        super().__init__(n_peers, genesis)
+        self.part = part
+        self.parts = parts
+        self.mined = 0
+
+    def add(self, block, time, blk_id=None):
+        if blk_id is None:
+            blk_id = 2 + self.mined * self.parts + self.part
+            self.mined += 1
+        return super().add(block, time, blk_id)
+
+class PartitionSimulation(Simulation):
+    """
+    The part of a simulation run by one worker process of a ParallelSimulation.
+
+    Every worker builds the whole network from the same parameters, so the topology,
+    peer types and link delays are those of the sequential simulation, but only handles
+    the events of the peers it owns. Messages to other peers are encoded as plain tuples
+    in an outbox, and received messages are decoded into the local TxnStore and block
+    tree, so a txn or block reaching a partition twice is recognised by its ID.
+    Each partition draws mining times, block contents, queuing delays and IDs from its own
+    streams, so runs match the sequential engine statistically, not event for event; the
+    transactions of each peer are drawn as in the sequential engine.
+
+    Attributes:
+        part (int): Index of the partition.
+        owner (list): Partition of each peer.
+        outbox (list): Encoded messages to each partition, sent at the end of the window.
+        sent_txns (list): txnIds of the transactions sent to each partition.
+        sent_blocks (list): blk_ids of the blocks sent to each partition.
+    """
+    def __init__(self, part, owner, **params):
+        """
+        Initialize a PartitionSimulation instance.
+
+        Args:
+            part (int): Index of the partition.
+            owner (list): Partition of each peer.
+            params: Keyword arguments of Simulation.
+        """
+        super().__init__(**params)
+        parts = max(owner) + 1
+        self.part = part
+        self.owner = owner
+        self.parts = parts
+        self.tree = PartitionTree(self.n, self.genesis, part, parts)
+        self.chain_stats = ChainStats(self.tree, self.peers)
+        # streams spawned next to those of rng_streams, one set per partition
+        self.mining_rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(3, part)))
+        self.links.rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(4, part)))
+        self.outbox = [[] for _ in range(parts)]
+        self.sent_txns = [set() for _ in range(parts)]
+        self.sent_blocks = [set() for _ in range(parts)]
+
+    def new_txn_id(self):
+        self.txn_ctr += 1
+        return (self.txn_ctr - 1) * self.parts + self.part
+
+    def start(self):
+        """
+        Schedule the first block and transaction of every peer of the partition.
+        """
+        self.started = True
+        for peer in self.peers:
+            if self.owner[peer.peer_id] == self.part:
+                peer.mineNewBlock(self.genesis, 0)
+                peer.scheduleNextTxn(0)
+
+    def _encode_txn(self, txn, dest):
+        # a txn goes in full the first time it is sent to a partition, by ID afterwards
+        sent = self.sent_txns[dest]
+        if txn in sent:
+            return txn
+        sent.add(txn)
+        txns = self.txns
+        return (txn, int(txns.sender[txn]), int(txns.receiver[txn]), int(txns.coins[txn]), bool(txns.coinbase[txn]))
+
+    def _decode_txn(self, data):
+        if type(data) is int:
+            return data
+        if not self.txns.known(data[0]):
+            self.txns.add(*data)
+        return data[0]
+
+    def _encode_block(self, block, dest):
+        # the receiving partition may lack ancestors that only travelled inside this one,
+        # so every block not sent to it yet goes with the message, oldest first
+        sent = self.sent_blocks[dest]
+        blk_id, chain = block.blk_id, []
+        while block.blk_id != 1 and block.blk_id not in sent and (block.blk_id - 2) % self.parts != dest:
+            sent.add(block.blk_id)
+            chain.append((block.blk_id, block.parent_blk.blk_id, block.miner.peer_id, float(self.tree.created[block.blk_id]),
+                          [self._encode_txn(txn, dest) for txn in block.txn_in_blk.tolist()]))
+            block = block.parent_blk
+        return blk_id, chain[::-1]
+
+    def _decode_block(self, data):
+        blk_id, parent_id, miner_id, created, txns = data
+        tree = self.tree
+        if blk_id < len(tree.blocks) and tree.blocks[blk_id] is not None:
+            return
+        txn_ids = np.array([self._decode_txn(txn) for txn in txns], dtype=np.int64)
+        block = Block(self.peers[miner_id], tree.blocks[parent_id], txn_ids, txns=self.txns)
+        tree.add(block, created, blk_id)
+        block.index_txns(self.txns)
+
+    def enqueue(self, handler):
+        """
+        Enqueue a handler, or put it in the outbox if its receiver is in another partition.
+
+        Args:
+            handler (Handler): The handler to be enqueued.
+
+        Returns:
+            int: Token of the event, None if it was sent to another partition.
+        """
+        receiver = handler.receiver
+        dest = self.part if receiver is None else self.owner[receiver.peer_id]
+        if dest == self.part:
+            return self.handler_queue.push(handler.time_occured, handler)
+        txn = handler.txn
+        if isinstance(txn, list):
+            txn = [self._encode_txn(item, dest) for item in txn]
+        elif txn is not None:
+            txn = self._encode_txn(txn, dest)
+        blk = self._encode_block(handler.blk, dest) if handler.blk is not None else None
+        # txn messages name their sender by peer_id, block messages by Peer
+        sender = handler.sender
+        sender = (sender, False) if isinstance(sender, int) else (sender.peer_id, True)
+        self.outbox[dest].append((handler.time_occured, handler.type, sender, receiver.peer_id, txn, blk))
+
+    def deliver(self, messages):
+        """
+        Enqueue messages from other partitions, in the order they were sent.
+
+        Args:
+            messages (list): Encoded messages.
+        """
+        peers = self.peers
+        for time, type, (sender, is_peer), receiver, txn, blk in messages:
+            if isinstance(txn, list):
+                txn = [self._decode_txn(item) for item in txn]
+            elif txn is not None:
+                txn = self._decode_txn(txn)
+            if blk is not None:
+                for data in blk[1]:
+                    self._decode_block(data)
+                blk = self.tree.blocks[blk[0]]
+            self.handler_queue.push(time, Handler(type, time, peers[sender] if is_peer else sender, peers[receiver], txn, blk))
+
+    def run_window(self, end):
+        """
+        Handle the events before a time, with the same stopping rule as Simulation.run:
+        past simulation_time, only the messages in flight are handled.
+
+        Args:
+            end (float): End of the window.
+
+        Returns:
+            list: The outbox, encoded messages to each partition.
+        """
+        queue, limit = self.handler_queue, self.simulation_time
+        while len(queue) > 0 and queue.peek_time() < end:
+            time, event = queue.pop()
+            if time < limit or event.type in IN_FLIGHT:
+                DISPATCH[event.type](event)
+                self.events += 1
+            else:
+                drop(event)
+        outbox, self.outbox = self.outbox, [[] for _ in range(self.parts)]
+        return outbox
+
+    def next_time(self):
+        """
+        Get the time of the next event of the partition.
+
+        Returns:
+            float: The time, math.inf if the queue is empty.
+        """
+        return self.handler_queue.peek_time() if len(self.handler_queue) > 0 else math.inf
+
+    def results(self):
+        """
+        Get the counters of the peers of the partition.
+
+        Returns:
+            dict: 'peers', (created_blocks_own, orphan hits, orphan evictions) by peer ID,
+            'events', the number of events handled, and 'chain_stats', the ChainStats of
+            peer 0 if the partition owns it, None otherwise.
+        """
+        return {
+            'peers': {peer.peer_id: (peer.created_blocks_own, peer.orphanBlocks.hits, peer.orphanBlocks.evictions)
+                      for peer in self.peers if self.owner[peer.peer_id] == self.part},
+            'events': self.events,
+            'chain_stats': self.chain_stats if self.owner[0] == self.part else None,
+        }
+
+def _partition_worker(conn, part, owner, params):
+    sim = PartitionSimulation(part, owner, **params)
+    sim.start()
+    conn.send(sim.next_time())
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        end, inbox = message
+        sim.deliver(inbox)
+        conn.send((sim.run_window(end), sim.next_time()))
+    conn.send(sim.results())
+    conn.close()
+
+class ParallelSimulation:
+    """
+    A simulation whose peers are split into partitions run by worker processes.
+
+    Synchronization is conservative and window based: all partitions handle their events
+    in [T, T + lookahead), where T is the earliest pending event of the whole network and
+    lookahead the smallest delay of a link between two partitions, so no message sent in
+    the window can arrive within it. The messages between partitions are exchanged in one
+    batch per window, through this process. Trace, checkpoints and instrumentation are
+    only available in the sequential engine.
+
+    Attributes:
+        sim (Simulation): A sequential replica of the network, for its topology and peers.
+        owner (list): Partition of each peer.
+        lookahead (float): Length of a window.
+        windows (int): Number of windows run.
+        events (list): Number of events handled by each partition.
+        chain_stats (ChainStats): Statistics of peer 0, once the run is over.
+    """
+    def __init__(self, parts=2, **params):
+        """
+        Initialize a ParallelSimulation instance.
+
+        Args:
+            parts (int): Number of partitions and worker processes.
+            params: Keyword arguments of Simulation, without trace_path.
+
+        Raises:
+            ValueError: If a trace or analytic gossip is requested.
+        """
+        if params.get('trace_path'):
+            raise ValueError("traces are not supported with partitions")
+        if params.get('gossip') == 'analytic':
+            raise ValueError("analytic gossip is not supported with partitions")
+        self.params = params
+        self.parts = parts
+        self.sim = Simulation(**params)
+        self.owner = partition_peers(self.sim.graph, self.sim.n, parts)
+        self.lookahead = lookahead(self.sim.links, self.sim.peers, self.owner)
+        self.windows = 0
+        self.events = []
+        self.chain_stats = None
+
+    def run(self):
+        """
+        Run the simulation until simulation_time, then deliver the messages still in flight.
+        """
+        context = multiprocessing.get_context()
+        conns, workers = [], []
+        for part in range(self.parts):
+            conn, child = context.Pipe()
+            worker = context.Process(target=_partition_worker, args=(child, part, self.owner, self.params))
+            worker.start()
+            conns.append(conn)
+            workers.append(worker)
+
+        next_times = [conn.recv() for conn in conns]
+        inboxes = [[] for _ in range(self.parts)]
+        start = min(next_times)
+        while start < math.inf:
+            end = start + self.lookahead
+            for conn, inbox in zip(conns, inboxes):
+                conn.send((end, inbox))
+            inboxes = [[] for _ in range(self.parts)]
+            for part, conn in enumerate(conns):
+                outbox, next_times[part] = conn.recv()
+                for receiver, messages in zip(inboxes, outbox):
+                    receiver.extend(messages)
+            self.windows += 1
+            start = min(next_times + [message[0] for inbox in inboxes for message in inbox])
+
+        for conn in conns:
+            conn.send(None)
+        results = [conn.recv() for conn in conns]
+        for worker in workers:
+            worker.join()
+
+        peers = self.sim.peers
+        for result in results:
+            for peer_id, (created, hits, evictions) in result['peers'].items():
+                peers[peer_id].created_blocks_own = created
+                peers[peer_id].orphanBlocks.hits = hits
+                peers[peer_id].orphanBlocks.evictions = evictions
+            if result['chain_stats'] is not None:
+                self.chain_stats = result['chain_stats']
+        self.events = [result['events'] for result in results]
+
+    def summary(self):
+        """
+        Get the network statistics of the simulation, once it has run.
+
+        Returns:
+            dict: Statistics as returned by stats.network_stats.
+        """
+        return network_stats(self.sim.peers, self.chain_stats)
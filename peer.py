@@ -1,9 +1,22 @@
-from helper import blk_incre, rng
-from transaction import Transaction
+from time import perf_counter
+import numpy as np
 from block import Block
+from txnstore import TxnSet, TXN_SIZE
 from collections import deque
-import networkx as nx
-from handler import Handler, enqueue
+from orphan import OrphanPool
+from blocktree import UNSEEN, ACCEPTED
+from eventtrace import TXN_CREATED, TXN_RECEIVED
+from handler import (Handler, TXN_GEN, TXN_RECV, BLOCK_RECV, BLOCK_MINED, TXN_INV, TXN_GETDATA, TXN_BATCH, INV_FLUSH,
+                     CMPCT_BLOCK, GET_BLOCK_TXN, BLOCK_TXN)
+
+# size of a txn announcement or request, a 32 byte hash relative to a 1 KB txn
+INV_SIZE = 0.032
+# time between two flushes of the queued announcements of a peer
+INV_INTERVAL = 100
+# size of the short ID of a txn in a compact block, 6 bytes as in BIP 152
+SHORT_ID_SIZE = 0.006
+# most txns in a mined block besides the coinbase txn
+MAX_BLOCK_TXNS = 1022
 
 def compute_linkLatency(sender, receiver, txn_size = 1):
     """
@@ -17,26 +30,79 @@ def compute_linkLatency(sender, receiver, txn_size = 1):
     Returns:
         float: The computed link latency.
     """
-    latency = rng.uniform(10, 500, 1)
-    bandwidth = 5 if sender.is_slow or receiver.is_slow else 100
-    delay = rng.exponential(96 / bandwidth)
-    return latency + (txn_size/bandwidth) + delay
+    return sender.sim.links.latency(sender.peer_id, receiver.peer_id, txn_size)
 
-def verify_block(block):
+def compact_block_size(block, txns):
+    """
+    Compute the size of a block sent as a compact block.
+
+    A compact block holds the header, the coinbase txn in full and a short ID for every other txn.
+
+    Args:
+        block (Block): The block.
+        txns (TxnStore): Store holding the transactions of the block.
+
+    Returns:
+        float: The size.
+    """
+    coinbase = int(np.count_nonzero(txns.coinbase[block.txn_in_blk]))
+    return 1 + coinbase + SHORT_ID_SIZE * (len(block.txn_in_blk) - coinbase)
+
+def select_txns(senders, coins, balances, limit, rng):
+    """
+    Choose a random set of txns that no sender can overspend.
+
+    The candidates are shuffled and each sender's running total is taken over its txns
+    in that order, so a sender's txns are kept up to the last one its balance covers.
+    A random number of the kept txns, at most limit, is then taken in shuffled order.
+
+    Args:
+        senders (numpy.ndarray): Sender of each candidate txn.
+        coins (numpy.ndarray): Coins of each candidate txn.
+        balances (numpy.ndarray): Balance of the sender of each candidate txn.
+        limit (int): Most txns to choose.
+        rng (numpy.random.Generator): Generator for the choice.
+
+    Returns:
+        numpy.ndarray: Indices of the chosen candidates.
+    """
+    order = rng.permutation(len(senders))
+    # txns no single balance covers would block the later txns of their sender
+    order = order[coins[order] <= balances[order]]
+    by_sender = order[np.argsort(senders[order], kind='stable')]
+    spent = np.cumsum(coins[by_sender])
+    first = np.flatnonzero(np.diff(senders[by_sender], prepend=-1))
+    group_sizes = np.diff(np.r_[first, len(by_sender)])
+    spent -= np.repeat(spent[first] - coins[by_sender][first], group_sizes)
+    keep = np.zeros(len(senders), dtype=bool)
+    keep[by_sender[spent <= balances[by_sender]]] = True
+    chosen = order[keep[order]]
+
+    count = len(chosen)
+    if count > 1:
+        count = rng.integers(1, count)
+    return chosen[:min(count, limit)]
+
+def verify_block(block, txns, tree):
     """
     Verify the integrity of a block.
 
+    A block is valid if no sender spends more than its balance at the parent block.
+
     Args:
         block (Block): The block to be verified.
+        txns (TxnStore): Store holding the transactions of the block.
+        tree (BlockTree): Tree holding the parent block, for its balance cache.
 
     Returns:
         bool: True if the block is valid, False otherwise.
     """
-    for txn in block.txn_in_blk:
-        if not txn.coinbase:
-            if not (block.balance[txn.sender.peer_id] ==  block.parent_blk.balance[txn.sender.peer_id] - txn.coins and
-            block.balance[txn.receiver.peer_id] == block.parent_blk.balance[txn.receiver.peer_id] + txn.coins and
-            block.balance[txn.sender.peer_id] < 0): return False
+    ids = block.txn_in_blk[~txns.coinbase[block.txn_in_blk]]
+    peer_ids, sender_index = np.unique(txns.sender[ids], return_inverse=True)
+    spent = np.zeros(len(peer_ids), dtype=np.int64)
+    np.add.at(spent, sender_index, txns.coins[ids])
+    for peer_id, coins in zip(peer_ids.tolist(), spent.tolist()):
+        if tree.balance(block.parent_blk, peer_id) < coins: return False
     return True
 
 class Peer:
@@ -44,78 +110,134 @@ class Peer:
         Initialize a Peer instance.
 
         Args:
+            sim (Simulation): The simulation the peer belongs to.
+            peer_id (int): ID of the peer.
             is_slow (bool): Flag indicating if the peer is slow.
             is_low_cpu (bool): Flag indicating if the peer has low CPU.
             genesis (Block): The genesis block.
             miningTime (float): Average inter-arrival time/hashpower.
         """
-    peer_ctr = 0
-    def __init__(self, is_slow, is_low_cpu, genesis, miningTime,):
-        self.peer_id = Peer.peer_ctr
-        Peer.peer_ctr += 1
+    __slots__ = ('sim', 'peer_id', 'is_slow', 'is_low_cpu', 'connected_peers', 'txnReceived', 'pendingTxns',
+                 'orphanBlocks', 'last_blk_id', 'miningTime', 'created_blocks_own', 'txnRng', 'txnAnnounced',
+                 'invQueue', 'invFlushPending', 'blockTxnRequested', 'miningToken')
+
+    def __init__(self, sim, peer_id, is_slow, is_low_cpu, genesis, miningTime,):
+        self.sim = sim
+        self.peer_id = peer_id
         self.is_slow = is_slow
         self.is_low_cpu = is_low_cpu
         self.connected_peers = set() # neighbours of the node
-        self.txnReceived = set() # txn received till now 
-
-        self.blockChain = dict() # blockchain of the node
-        self.blockReceived = set() # blocks received till now 
-        self.blockTime = dict() # time at which each block arrived
-        self.orphanBlocks = set() # blocks received whose parents have not been received yet
-        self.blockTime[1] = 0
-        self.g = nx.DiGraph() # graph
-        
+        self.txnReceived = TxnSet() # txn received till now
+        self.pendingTxns = TxnSet() # txn received but not included in the current chain
+        self.txnAnnounced = dict() # txn requested but not received yet -> neighbours that announced it
+        self.invQueue = dict() # neighbour -> txns to announce at the next flush
+        self.invFlushPending = False
+        self.blockTxnRequested = set() # compact blocks waiting for their missing txns
+
+        # the blockchain of the node is its row of sim.tree
+        self.orphanBlocks = OrphanPool(sim.max_orphans) # blocks received whose parents have not been received yet
         self.last_blk_id = genesis.blk_id
-        self.blockChain[self.last_blk_id] = genesis
         self.miningTime = miningTime # avg interarrival time/hashpower
         self.created_blocks_own = 0
+        self.miningToken = None # queue token of the pending BlockMined event, None if not mining
+        self.txnRng = sim.txn_rngs[peer_id] # draws txn interarrival times, receivers and coins
+
+    # peers are pickled as empty shells wherever they are referenced, their attributes are
+    # pickled by Simulation.__getstate__ so that pickling does not recurse through the network
+    def __getstate__(self):
+        return None
 
-    def connect_to_peers(self, peer_objects, edges):
+    def connect_to_peers(self, peer_objects, neighbours):
         """
         Connect to peer nodes.
 
         Args:
-            peer_objects (list): List of Peer objects.
-            edges (list): List of edges representing connections.
+            peer_objects (list): List of Peer objects, indexed by peer ID.
+            neighbours (iterable): IDs of the neighbours of the peer.
         """
-        connected_nodes = set()
-        for edge in edges:
-            if edge[0] == self.peer_id:
-                connected_nodes.add(edge[1])
-            elif edge[1] == self.peer_id:
-                connected_nodes.add(edge[0])
-
-        # Convert connected node IDs to corresponding Peer objects
-        connected_peers = []
-        for node_id in connected_nodes:
-            for peer in peer_objects:
-                if peer.peer_id == node_id:
-                    connected_peers.append(peer)
-
-        self.connected_peers = connected_peers
+        self.connected_peers = [peer_objects[node_id] for node_id in sorted(neighbours)]
 
     def broadcast_txn(self, handler):
         """
         Broadcast a transaction to connected peers.
 
+        With flood gossip the full transaction is sent to every neighbour. With inv gossip
+        it is only queued for announcement, see announceTxn. With analytic gossip it is
+        logged, and reaches the other peers when they sync, see syncTxns.
+
         Args:
             handler (Handler): Handler object containing transaction information.
         """
-        for neighbour in self.connected_peers:
-            new_time = handler.time_occured + compute_linkLatency(self, neighbour)
-            enqueue(Handler("TxnRecv", new_time, self.peer_id, neighbour, handler.txn))
+        if self.sim.gossip == 'inv':
+            self.announceTxn(handler.txn, handler.time_occured)
+            return
+        if self.sim.gossip == 'analytic':
+            self.sim.txn_arrivals.publish(handler.txn, self.peer_id, handler.time_occured)
+            return
+
+        arrivals = self.sim.links.arrivals(self.peer_id, handler.time_occured)
+        for neighbour, new_time in zip(self.connected_peers, arrivals):
+            self.sim.enqueue(Handler(TXN_RECV, new_time, self.peer_id, neighbour, handler.txn))
+
+    def scheduleNextTxn(self, time):
+        """
+        Schedule the next TxnGen event of this peer.
+
+        Args:
+            time (float): Time of the previous transaction generation.
+        """
+        t = time + self.txnRng.exponential(self.sim.txn_mean)
+        if t < self.sim.simulation_time:
+            txn = self.sim.txns.add(self.sim.new_txn_id(), self.peer_id, int(self.txnRng.integers(self.sim.n)))
+            self.sim.enqueue(Handler(TXN_GEN, t, sender=self, txn=txn))
+
+    def syncTxns(self, time):
+        """
+        Receive the txns that reached this peer by a given time, with analytic gossip.
+
+        Args:
+            time (float): Current time.
+        """
+        if self.sim.txn_arrivals is not None:
+            self.sim.txn_arrivals.sync(self, time)
+
+    def lastBlock(self):
+        """
+        Get the block at the tip of the current chain.
+
+        Returns:
+            Block: The last block.
+        """
+        return self.sim.tree.blocks[self.last_blk_id]
+
+    def chainIncludes(self, txn):
+        """
+        Check if a transaction is included in the current chain.
+
+        Args:
+            txn (int): txnId of the transaction.
+
+        Returns:
+            bool: True if a block of the chain ending at the tip contains the transaction.
+        """
+        return self.lastBlock().includes(txn, self.sim.txns, self.sim.tree.blocks)
 
     # generates transactions
     def txnSend(self, handler):
         """
-        Send a transaction to connected peers.
+        Send a transaction to connected peers and schedule the next one.
 
         Args:
             handler (Handler): Handler object containing transaction information.
         """
-        curr_bal = self.blockChain[self.last_blk_id].balance[self.peer_id]
-        handler.txn.coins = rng.integers(1, curr_bal)
+        self.scheduleNextTxn(handler.time_occured)
+        curr_bal = self.sim.tree.balance(self.lastBlock(), self.peer_id)
+        if curr_bal < 2: return # nothing left to spend
+        self.sim.txns.coins[handler.txn] = int(self.txnRng.integers(1, curr_bal))
         self.txnReceived.add(handler.txn)
+        self.pendingTxns.add(handler.txn)
+        if self.sim.txn_trace is not None:
+            self.sim.txn_trace.record(TXN_CREATED, handler.time_occured, self.peer_id, handler.txn)
         self.broadcast_txn(handler)
 
     # forwards transactions
@@ -128,36 +250,229 @@ class Peer:
         """
         if handler.txn not in self.txnReceived:
             self.txnReceived.add(handler.txn)
+            if not self.chainIncludes(handler.txn):
+                self.pendingTxns.add(handler.txn)
+            if self.sim.txn_trace is not None:
+                self.sim.txn_trace.record(TXN_RECEIVED, handler.time_occured, self.peer_id, handler.txn)
             self.broadcast_txn(handler)
 
+    # inv gossip: txns are announced in batches and sent on request
+    def announceTxn(self, txn, time):
+        """
+        Queue a transaction for announcement to the neighbours that did not announce it,
+        and schedule a flush of the announcements if none is pending.
+
+        Args:
+            txn (int): txnId of the transaction, just received or generated.
+            time (float): Current time.
+        """
+        announced = self.txnAnnounced.pop(txn, ())
+        for neighbour in self.connected_peers:
+            if neighbour.peer_id not in announced:
+                self.invQueue.setdefault(neighbour.peer_id, []).append(txn)
+        if not self.invFlushPending:
+            self.invFlushPending = True
+            self.sim.enqueue(Handler(INV_FLUSH, time + self.sim.inv_interval, receiver=self))
+
+    def invFlush(self, handler):
+        """
+        Send the queued announcements, one message per neighbour.
+
+        Args:
+            handler (Handler): Handler object of the flush.
+        """
+        self.invFlushPending = False
+        for neighbour in self.connected_peers:
+            txns = self.invQueue.pop(neighbour.peer_id, None)
+            if txns:
+                latency = compute_linkLatency(self, neighbour, INV_SIZE * len(txns))
+                self.sim.enqueue(Handler(TXN_INV, handler.time_occured + latency, self.peer_id, neighbour, txns))
+
+    def txnInv(self, handler):
+        """
+        Receive announced transactions and request the new ones from the announcer.
+
+        Transactions already requested from another neighbour are not requested again.
+
+        Args:
+            handler (Handler): Handler object containing the list of transactions and the peer_id of the announcer.
+        """
+        wanted = []
+        for txn in handler.txn:
+            if txn in self.txnReceived:
+                continue
+            announced = self.txnAnnounced.get(txn)
+            if announced is None:
+                self.txnAnnounced[txn] = {handler.sender}
+                wanted.append(txn)
+            else:
+                announced.add(handler.sender)
+        if wanted:
+            neighbour = self.sim.peers[handler.sender]
+            latency = compute_linkLatency(self, neighbour, INV_SIZE * len(wanted))
+            self.sim.enqueue(Handler(TXN_GETDATA, handler.time_occured + latency, self.peer_id, neighbour, wanted))
+
+    def txnGetData(self, handler):
+        """
+        Send requested transactions.
+
+        Args:
+            handler (Handler): Handler object containing the list of transactions and the peer_id of the requester.
+        """
+        neighbour = self.sim.peers[handler.sender]
+        latency = compute_linkLatency(self, neighbour, TXN_SIZE * len(handler.txn))
+        self.sim.enqueue(Handler(TXN_BATCH, handler.time_occured + latency, self.peer_id, neighbour, handler.txn))
+
+    def txnBatch(self, handler):
+        """
+        Receive requested transactions and announce them.
+
+        Args:
+            handler (Handler): Handler object containing the list of transactions.
+        """
+        for txn in handler.txn:
+            if txn not in self.txnReceived:
+                self.txnReceived.add(txn)
+                if not self.chainIncludes(txn):
+                    self.pendingTxns.add(txn)
+                if self.sim.txn_trace is not None:
+                    self.sim.txn_trace.record(TXN_RECEIVED, handler.time_occured, self.peer_id, txn)
+                self.announceTxn(txn, handler.time_occured)
+
+    # moves the tip of the current chain, returning txns of abandoned blocks to the pending set
+    def switchTip(self, block):
+        """
+        Make a block the tip of the current chain and update the pending transactions.
+
+        Args:
+            block (Block): The new tip, already present in the blockchain.
+        """
+        old_tip = self.lastBlock()
+        self.last_blk_id = block.blk_id
+
+        old_branch, new_branch = [], []
+        while old_tip.chain_length > block.chain_length:
+            old_branch.append(old_tip)
+            old_tip = old_tip.parent_blk
+        while block.chain_length > old_tip.chain_length:
+            new_branch.append(block)
+            block = block.parent_blk
+        while old_tip is not block:
+            old_branch.append(old_tip)
+            new_branch.append(block)
+            old_tip, block = old_tip.parent_blk, block.parent_blk
+
+        for blk in old_branch:
+            self.pendingTxns.update(blk.txn_in_blk[self.txnReceived.contains(blk.txn_in_blk)])
+        for blk in new_branch:
+            self.pendingTxns.difference_update(blk.txn_in_blk)
+
     # new block generation
     def mineNewBlock(self, block, lat):
         """
-        Mine a new block.
+        Start mining on top of a block, cancelling the attempt on the previous tip.
+
+        The contents of the block are only chosen by buildBlock once mining completes,
+        so a superseded attempt costs nothing but its cancelled queue entry.
 
         Args:
-            block (Block): The block to be mined.
+            block (Block): The block to be mined on.
             lat (float): Latency.
         """
-        while True:
-            remaingTxn = self.txnReceived.difference(block.txn_mem_pool)
-            toBeDeleted = set([i for i in remaingTxn if i.coins > block.balance[i.sender.peer_id]])
-            remaingTxn = remaingTxn.difference(toBeDeleted)
-            numTxn = len(remaingTxn)
-            
-            if numTxn > 1:
-                numTxn = min(rng.integers(1, numTxn), 1022) # 1 for coinbase txn, 1 for itself
+        if self.miningToken is not None:
+            self.sim.handler_queue.cancel(self.miningToken)
+        lat = lat + self.sim.mining_rng.exponential(self.miningTime) #takes mean not lambda
+        self.miningToken = self.sim.enqueue(Handler(BLOCK_MINED, lat, sender=self, blk=block))
 
-            txnToInclude = set(rng.choice(list(remaingTxn), numTxn))
-            coinBaseTxn = Transaction(self, self, 50, True)
-            txnToInclude.add(coinBaseTxn)
+    def buildBlock(self, block):
+        """
+        Build a valid block on top of a block from the pending transactions.
 
-            newBlock = Block(self, block, txnToInclude)
-            if verify_block(newBlock): break
+        Args:
+            block (Block): The parent block, the tip of the peer.
 
-        lat = lat + rng.exponential(self.miningTime) #takes mean not lambda
-        enqueue(Handler("BlockMined", lat, blk=newBlock))
+        Returns:
+            Block: The new block, with a coinbase transaction.
+        """
+        instrument = self.sim.instrument
+        if instrument is not None:
+            start = perf_counter()
+        txns = self.sim.txns
+        txnToInclude = []
+        if self.pendingTxns:
+            candidates = self.pendingTxns.ids()
+            senders = txns.sender[candidates].astype(np.int64)
+            coins = txns.coins[candidates]
+            peer_ids, sender_index = np.unique(senders, return_inverse=True)
+            tree = self.sim.tree
+            balances = np.array([tree.balance(block, peer_id) for peer_id in peer_ids.tolist()], dtype=np.int64)[sender_index]
+            chosen = select_txns(senders, coins, balances, MAX_BLOCK_TXNS, self.sim.mining_rng)
+            txnToInclude = candidates[np.sort(chosen)]
+        coinbase = txns.add(self.sim.new_txn_id(), self.peer_id, self.peer_id, 50, True)
+        newBlock = Block(self, block, np.append(txnToInclude, coinbase).astype(np.int64), txns=txns)
+        if instrument is not None:
+            instrument.record_mining(len(self.pendingTxns), len(txnToInclude), perf_counter() - start)
+        return newBlock
+
+    def relayBlock(self, block, time):
+        """
+        Send a block to all neighbours, in full or as a compact block depending on sim.block_relay.
 
+        Args:
+            block (Block): The block.
+            time (float): Time at which the block is sent.
+        """
+        if self.sim.block_relay == 'compact':
+            type, size = CMPCT_BLOCK, compact_block_size(block, self.sim.txns)
+        else:
+            type, size = BLOCK_RECV, block.size
+        arrivals = self.sim.links.arrivals(self.peer_id, time, size)
+        for peer, latency in zip(self.connected_peers, arrivals):
+            self.sim.enqueue(Handler(type, latency, sender=self, receiver=peer, blk=block))
+
+    # compact block relay: the block is rebuilt from the txns the peer already received,
+    # the missing ones are fetched from the sender in one more round trip
+    def compactBlockRecv(self, handler):
+        """
+        Receive a compact block and request its missing transactions from the sender.
+
+        Args:
+            handler (Handler): Handler object containing the block and the sending peer.
+        """
+        blk = handler.blk
+        if self.sim.tree.state[self.peer_id, blk.blk_id] != UNSEEN or blk.blk_id in self.blockTxnRequested:
+            return
+        self.syncTxns(handler.time_occured)
+        ids = blk.txn_in_blk
+        missing = ids[~self.sim.txns.coinbase[ids] & ~self.txnReceived.contains(ids)].tolist()
+        if not missing:
+            self.verifyAndAddReceivedBlock(handler)
+            return
+        self.blockTxnRequested.add(blk.blk_id)
+        latency = compute_linkLatency(self, handler.sender, SHORT_ID_SIZE * len(missing))
+        self.sim.enqueue(Handler(GET_BLOCK_TXN, handler.time_occured + latency, sender=self, receiver=handler.sender,
+                                 txn=missing, blk=blk))
+
+    def getBlockTxn(self, handler):
+        """
+        Send the requested transactions of a compact block.
+
+        Args:
+            handler (Handler): Handler object containing the block, the list of transactions and the requesting peer.
+        """
+        latency = compute_linkLatency(self, handler.sender, TXN_SIZE * len(handler.txn))
+        self.sim.enqueue(Handler(BLOCK_TXN, handler.time_occured + latency, sender=self, receiver=handler.sender,
+                                 txn=handler.txn, blk=handler.blk))
+
+    def blockTxnRecv(self, handler):
+        """
+        Receive the missing transactions of a compact block and add the block.
+
+        Args:
+            handler (Handler): Handler object containing the block.
+        """
+        self.blockTxnRequested.discard(handler.blk.blk_id)
+        self.verifyAndAddReceivedBlock(handler)
 
     #this function is called, if block receives a node from its peers
     #block is verified and if the block is without any errors then its is added to blockchain 
@@ -170,63 +485,59 @@ class Peer:
         Args:
             handler (Handler): Handler object containing block information.
         """
-        if handler.blk.blk_id not in self.blockReceived:
-            self.blockReceived.add(handler.blk.blk_id)
-            if not verify_block(handler.blk):
+        tree = self.sim.tree
+        if tree.state[self.peer_id, handler.blk.blk_id] == UNSEEN:
+            tree.receive(self.peer_id, handler.blk.blk_id, handler.time_occured)
+            if not verify_block(handler.blk, self.sim.txns, tree):
                 return
-            if handler.blk.parent_blk.blk_id not in self.blockChain:
-                self.orphanBlocks.add(handler.blk)
+            if tree.state[self.peer_id, handler.blk.parent_blk.blk_id] != ACCEPTED:
+                # evicted orphans may be accepted again if another neighbour relays them
+                for evicted in self.orphanBlocks.add(handler.blk):
+                    tree.forget(self.peer_id, evicted.blk_id)
                 return
 
+            self.syncTxns(handler.time_occured)
             orphan_processing_queue = deque([handler.blk])
             last_block_in_chain = handler.blk
 
             while orphan_processing_queue:
                 current_block = orphan_processing_queue.popleft()
-                self.blockTime[current_block.blk_id] = handler.time_occured
-                self.blockChain[current_block.blk_id] = current_block
-                self.g.add_edge(current_block.blk_id, current_block.parent_blk.blk_id)
+                tree.accept(self.peer_id, current_block.blk_id, handler.time_occured)
 
                 if current_block.chain_length > last_block_in_chain.chain_length:
                     last_block_in_chain = current_block
 
-                for peer in self.connected_peers:
-                    latency = handler.time_occured + compute_linkLatency(self, peer, current_block.size)
-                    enqueue(Handler("BlockRecv", latency, sender=self, receiver=peer, blk=current_block))
+                self.relayBlock(current_block, handler.time_occured)
 
-                for orphan_block in list(self.orphanBlocks):
-                    if orphan_block.parent_blk.blk_id == current_block.blk_id:
-                        self.orphanBlocks.remove(orphan_block)
-                        orphan_processing_queue.append(orphan_block)
+                orphan_processing_queue.extend(self.orphanBlocks.pop_children(current_block.blk_id))
 
-            if last_block_in_chain.chain_length > self.blockChain[self.last_blk_id].chain_length:
-                self.last_blk_id = last_block_in_chain.blk_id
+            if last_block_in_chain.chain_length > self.lastBlock().chain_length:
+                self.switchTip(last_block_in_chain)
                 self.mineNewBlock(block=last_block_in_chain, lat=handler.time_occured)
 
         
-    # this function is called once the mining of a block is completed, 
-    # If after mining the addition of block creates a primary chain then
-    # the block is shared with neighbours and mining is continued otherwise 
-    # node waits a block whose addition will, create primary chain
+    # this function is called once the mining of a block is completed,
+    # attempts on a tip the peer has left are cancelled and never reach it,
+    # so the block always extends the current chain, it is shared with
+    # neighbours and mining continues on top of it
     def receiveSelfMinedBlock(self, handler):
         """
         Receive a self-mined block.
 
         Args:
-            handler (Handler): Handler object containing block information.
+            handler (Handler): Handler object whose blk is the tip the peer mined on.
         """
-        if handler.blk.chain_length <= self.blockChain[self.last_blk_id].chain_length:
-            return
+        self.miningToken = None
+        self.syncTxns(handler.time_occured)
+        block = self.buildBlock(handler.blk)
 
-        blk_incre()
+        self.sim.blk_create_ctr += 1
         self.created_blocks_own += 1
-        self.blockTime[handler.blk.blk_id] = handler.time_occured
-        self.blockChain[handler.blk.blk_id] = handler.blk
-        self.g.add_edge(handler.blk.blk_id, handler.blk.parent_blk.blk_id)
-        self.blockReceived.add(handler.blk.blk_id)
+        self.sim.tree.add(block, handler.time_occured)
+        block.index_txns(self.sim.txns)
+        self.sim.tree.accept(self.peer_id, block.blk_id, handler.time_occured)
+        self.switchTip(block)
 
-        for peer in self.connected_peers:
-            latency = handler.time_occured + compute_linkLatency(self, peer, handler.blk.size)
-            enqueue(Handler("BlockRecv", latency, sender=self, receiver=peer, blk=handler.blk))
+        self.relayBlock(block, handler.time_occured)
 
-        self.mineNewBlock(block=handler.blk, lat=handler.time_occured)
+        self.mineNewBlock(block=block, lat=handler.time_occured)
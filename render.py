@@ -0,0 +1,149 @@
+import os
+import shutil
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+from blocktree import ACCEPTED
+
+def parse_peers(spec, n):
+    """
+    Parse a selection of peers such as 'all', 'none' or '0,3,10-19'.
+
+    Args:
+        spec (str): The selection, 'all', 'none' or comma-separated IDs and inclusive ranges.
+        n (int): Number of peers.
+
+    Returns:
+        list: The selected peer IDs, sorted.
+
+    Raises:
+        ValueError: If the selection is malformed or names a peer outside 0 to n - 1.
+    """
+    if spec == 'all':
+        return list(range(n))
+    if spec == 'none':
+        return []
+    peer_ids = set()
+    for part in spec.split(','):
+        first, _, last = part.partition('-')
+        first, last = int(first), int(last or first)
+        if not 0 <= first <= last < n:
+            raise ValueError(f"peers {part} are not between 0 and {n - 1}")
+        peer_ids.update(range(first, last + 1))
+    return sorted(peer_ids)
+
+def tree_fingerprint(tree, peer_id):
+    """
+    Fingerprint the blockchain of a peer. Peers with the same accepted blocks have the same
+    fingerprint, and their figures are the same.
+
+    Args:
+        tree (BlockTree): The block tree of the simulation.
+        peer_id (int): ID of the peer.
+
+    Returns:
+        bytes: The fingerprint.
+    """
+    return hashlib.blake2b(np.packbits(tree.state[peer_id, :len(tree.blocks)] == ACCEPTED).tobytes()).digest()
+
+def tree_layout(ids, parents, heights):
+    """
+    Lay out a block tree in layers, in time linear in its number of blocks.
+
+    Each block sits at its height on the x axis. The child with the deepest subtree stays
+    in the row of its parent, so the longest chain is a straight line on row 0, and every
+    other child starts a new row below.
+
+    Args:
+        ids (numpy.ndarray): blk_ids of the blocks, in increasing order so parents come first.
+        parents (numpy.ndarray): blk_id of the parent of each block.
+        heights (numpy.ndarray): Chain length of each block.
+
+    Returns:
+        numpy.ndarray: (x, y) position of each block.
+    """
+    index = {blk_id: k for k, blk_id in enumerate(ids.tolist())}
+    parent_index = [index.get(parent, -1) for parent in parents.tolist()]
+    # greatest height in the subtree of each block, children come after their parents
+    deepest = heights.tolist()
+    children = [[] for _ in parent_index]
+    for k in range(len(parent_index) - 1, -1, -1):
+        p = parent_index[k]
+        if p >= 0:
+            children[p].append(k)
+            deepest[p] = max(deepest[p], deepest[k])
+
+    row = np.zeros(len(parent_index))
+    next_row = 0
+    stack = [(k, True) for k, p in enumerate(parent_index) if p < 0][::-1]
+    while stack:
+        k, new_row = stack.pop()
+        if new_row:
+            row[k] = next_row
+            next_row += 1
+        else:
+            row[k] = row[parent_index[k]]
+        ordered = sorted(children[k], key=lambda child: (-deepest[child], child))
+        stack.extend((child, child != ordered[0]) for child in reversed(ordered))
+    return np.column_stack((heights, -row))
+
+def draw_tree(ids, parents, heights, paths):
+    """
+    Draw a block tree and save the figure to one or more files.
+
+    Args:
+        ids (numpy.ndarray): blk_ids of the blocks, in increasing order.
+        parents (numpy.ndarray): blk_id of the parent of each block.
+        heights (numpy.ndarray): Chain length of each block.
+        paths (list): Paths of the image files, the figure is saved to the first one and copied to the others.
+    """
+    pos = tree_layout(ids, parents, heights)
+    index = {blk_id: k for k, blk_id in enumerate(ids.tolist())}
+    edges = [(pos[index[parent]], pos[k]) for k, parent in enumerate(parents.tolist()) if parent in index]
+    fig, ax = plt.subplots()
+    ax.add_collection(LineCollection(edges, colors='black', linewidths=0.5))
+    ax.scatter(pos[:, 0], pos[:, 1], s=10, c='red', zorder=2)
+    ax.set_axis_off()
+    fig.savefig(paths[0])
+    plt.close(fig)
+    for path in paths[1:]:
+        shutil.copyfile(paths[0], path)
+
+def render_blockchains(tree, peer_ids, directory='./figures', workers=None):
+    """
+    Save the blockchain of each selected peer to {directory}/blockchain_{peer_id}.png.
+
+    Peers with the same blockchain share one drawing, copied to each of their files, and
+    distinct blockchains are drawn in parallel.
+
+    Args:
+        tree (BlockTree): The block tree of the simulation.
+        peer_ids (list): IDs of the peers to draw.
+        directory (str): Directory of the figures.
+        workers (int): Number of worker processes, all cores if None, in this process if 1.
+
+    Returns:
+        int: Number of distinct blockchains drawn.
+    """
+    groups = dict()
+    for peer_id in peer_ids:
+        groups.setdefault(tree_fingerprint(tree, peer_id), []).append(peer_id)
+
+    jobs = []
+    for group in groups.values():
+        ids = np.flatnonzero(tree.state[group[0], :len(tree.blocks)] == ACCEPTED)
+        paths = [os.path.join(directory, f'blockchain_{peer_id}.png') for peer_id in group]
+        jobs.append((ids, tree.parent[ids], tree.height[ids], paths))
+
+    workers = min(workers or os.cpu_count(), len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            draw_tree(*job)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(draw_tree, *zip(*jobs)):
+                pass
+    return len(jobs)
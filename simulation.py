@@ -0,0 +1,326 @@
+import os
+import math
+import pickle
+import random
+
+from block import Block
+from peer import Peer, INV_INTERVAL
+from link import LinkModel
+from blocktree import BlockTree
+from orphan import MAX_ORPHANS
+from handler import (TXN_RECV, BLOCK_RECV, BLOCK_MINED, TXN_INV, TXN_GETDATA, TXN_BATCH, INV_FLUSH,
+                     CMPCT_BLOCK, GET_BLOCK_TXN, BLOCK_TXN)
+from event_queue import make_queue
+from helper import SEED, rng_streams
+from txnstore import TxnStore
+from topology import make_topology
+from stats import ChainStats, network_stats
+from eventtrace import TraceWriter, MINED
+from fastforward import TxnArrivals
+
+def _txn_gen(event):
+    event.sender.txnSend(event)
+
+def _txn_recv(event):
+    event.receiver.txnRecv(event)
+
+def _block_recv(event):
+    event.receiver.verifyAndAddReceivedBlock(event)
+
+def _block_mined(event):
+    event.sender.receiveSelfMinedBlock(event)
+
+def _txn_inv(event):
+    event.receiver.txnInv(event)
+
+def _txn_getdata(event):
+    event.receiver.txnGetData(event)
+
+def _txn_batch(event):
+    event.receiver.txnBatch(event)
+
+def _inv_flush(event):
+    event.receiver.invFlush(event)
+
+def _cmpct_block(event):
+    event.receiver.compactBlockRecv(event)
+
+def _get_block_txn(event):
+    event.receiver.getBlockTxn(event)
+
+def _block_txn(event):
+    event.receiver.blockTxnRecv(event)
+
+# handler of each event type, indexed by type code
+DISPATCH = (_txn_gen, _txn_recv, _block_recv, _block_mined, _txn_inv, _txn_getdata, _txn_batch, _inv_flush,
+            _cmpct_block, _get_block_txn, _block_txn)
+# messages still in flight at simulation_time, delivered before the run ends
+IN_FLIGHT = (TXN_RECV, BLOCK_RECV, TXN_INV, TXN_GETDATA, TXN_BATCH, INV_FLUSH, CMPCT_BLOCK, GET_BLOCK_TXN, BLOCK_TXN)
+
+def drop(event):
+    """
+    Drop an event popped after simulation_time without handling it.
+
+    A dropped BlockMined event leaves its peer not mining, so a tip change while the
+    messages in flight are delivered does not cancel the token of a popped event.
+
+    Args:
+        event (Handler): The event.
+    """
+    if event.type == BLOCK_MINED:
+        event.sender.miningToken = None
+
+class Simulation:
+    """
+    A single run of the P2P network simulation.
+
+    The simulation owns all of its state: the event queue, the random number
+    generators, the block and transaction counters and the peers, so several
+    simulations can live in one process.
+
+    Attributes:
+        handler_queue (HeapQueue or CalendarQueue): Queue of pending Handler events.
+        mining_rng (numpy.random.Generator): Generator for mining times and block contents.
+        link_rng (numpy.random.Generator): Generator for link delays.
+        txn_rngs (list): Generator for the transactions of each peer.
+        peers (list): List of Peer objects, indexed by peer ID.
+        txns (TxnStore): All transactions, indexed by txnId.
+        txn_arrivals (TxnArrivals): Arrivals of the txns at each peer with analytic gossip, None otherwise.
+        graph (networkx.Graph): Topology of the network.
+        links (LinkModel): Latency model of the links.
+        genesis (Block): The genesis block.
+        tree (BlockTree): All mined blocks and the per-peer view of them.
+        chain_stats (ChainStats): Chain and branch statistics of the first peer, kept up to date.
+        trace (TraceWriter): Binary trace of the run, None if not traced.
+        txn_trace (TraceWriter): The trace if it records transaction events, None otherwise.
+        blk_create_ctr (int): Number of blocks that made it into their miner's chain.
+        instrument (Instrumentation): Collector of the instrumented run, None otherwise.
+        started (bool): Whether the first events were scheduled.
+        now (float): Time of the last handled event, as of the last checkpoint or the end of run.
+        events (int): Number of events handled, as of the last checkpoint or the end of run.
+    """
+    def __init__(self, n=15, z0=10, z1=40, txn_mean=8, simulation_time=10000, seed=SEED, queue='heap', graph=None,
+                 max_orphans=MAX_ORPHANS, gossip='flood', inv_interval=INV_INTERVAL,
+                 block_relay='full', trace_path=None, trace_txns=False, topology='bounded'):
+        """
+        Initialize a Simulation instance and build the network.
+
+        Args:
+            n (int): Number of peers.
+            z0 (float): Percentage of slow peers.
+            z1 (float): Percentage of low CPU peers.
+            txn_mean (float): Interarrival time between transactions.
+            simulation_time (float): Time until which events are generated.
+            seed (int): Seed of all random number generators.
+            queue (str): Event queue backend, 'heap' or 'calendar'.
+            graph (networkx.Graph): Topology to use instead of a generated one, with nodes 0 to n - 1.
+            max_orphans (int): Maximum number of orphan blocks kept by each peer.
+            gossip (str): Transaction relay, 'flood' to send every txn to all neighbours,
+                'inv' to announce it and send it on request, or 'analytic' to deliver it to every
+                peer after the shortest-path delay of flooding, without an event per hop.
+            inv_interval (float): Time between the announcements of a peer with inv gossip.
+            block_relay (str): Block relay, 'full' to send whole blocks or 'compact' to send short
+                txn IDs and fetch the txns the receiver is missing.
+            trace_path (str): Path of a binary trace of the block events, None for no trace.
+            trace_txns (bool): Whether the trace also records transaction events.
+            topology (str): Generator of the topology, one of topology.TOPOLOGIES, if no graph is given.
+        """
+        self.n = n
+        self.txn_mean = txn_mean
+        self.simulation_time = simulation_time
+        self.seed = seed
+        self.max_orphans = max_orphans
+        self.gossip = gossip
+        self.inv_interval = inv_interval
+        self.block_relay = block_relay
+        self.mining_rng, self.link_rng, self.txn_rngs = rng_streams(seed, n)
+        self.handler_queue = make_queue(queue)
+        self.txns = TxnStore()
+        self.txn_ctr = 0
+        self.blk_create_ctr = 0
+        self.instrument = None # set by instrument.Instrumentation
+        self.started = False
+        self.now = 0 # time of the last handled event
+        self.events = 0
+        # peer types and topology use their own generator so they do not shift the event streams
+        py_rng = random.Random(seed)
+
+        z0, z1 = z0/100.0, z1/100.0
+
+        # genesis block
+        self.genesis = Block(parent_blk = 0, miner=None, balance = [1000]*n, blk_id = 1)
+        self.tree = BlockTree(n, self.genesis)
+
+        # CPU specs
+        slow_selec = set(py_rng.sample(range(n), int(z0*n)))
+        low_cpu_selec = set(py_rng.sample(range(n), int(z1*n)))
+
+        # hashing power
+        invh0 = n*(10 - 9*z1)
+        invh1 = invh0/10
+        I = 1000
+
+        self.peers = []
+        for i in range(n):
+            is_slow = i in slow_selec
+            is_low_cpu = i in low_cpu_selec
+            miningTime = I*invh0 if is_slow else I*invh1
+            self.peers.append(Peer(self, i, is_slow = is_slow, is_low_cpu = is_low_cpu, genesis=self.genesis, miningTime=miningTime))
+        self.chain_stats = ChainStats(self.tree, self.peers)
+
+        self.trace = TraceWriter(trace_path, n, trace_txns) if trace_path else None
+        self.txn_trace = self.trace if trace_txns else None
+        if self.trace is not None:
+            self.tree.trace = self.trace
+            self.trace.record(MINED, 0, -1, self.genesis.blk_id, 0, len(self.genesis.txn_in_blk))
+
+        if graph is None:
+            graph = make_topology(topology, n, seed=py_rng.getrandbits(64))
+        self.graph = graph
+
+        for peer in self.peers:
+            peer.connect_to_peers(self.peers, graph.adj.get(peer.peer_id, ()))
+        self.links = LinkModel(self.peers, graph.edges(), self.link_rng)
+        self.txn_arrivals = TxnArrivals(self) if gossip == 'analytic' else None
+
+    def __getstate__(self):
+        """
+        Get the state to pickle, with the attributes of the peers and the block tree first.
+
+        Blocks are then pickled in the order they were mined, so a block's parent is already
+        pickled, and peers referenced anywhere else are pickled as empty shells.
+
+        Returns:
+            dict: The state.
+        """
+        state = {'tree': self.tree,
+                 'peer_states': [{name: getattr(peer, name) for name in Peer.__slots__} for peer in self.peers]}
+        state.update(self.__dict__)
+        # the instrumentation holds closures, a resumed run attaches its own
+        state['instrument'] = None
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled simulation, filling in the attributes of its peers.
+
+        Args:
+            state (dict): The state returned by __getstate__.
+        """
+        peer_states = state.pop('peer_states')
+        self.__dict__.update(state)
+        for peer, peer_state in zip(self.peers, peer_states):
+            for name, value in peer_state.items():
+                setattr(peer, name, value)
+
+    def new_txn_id(self):
+        """
+        Get a fresh transaction ID.
+
+        Returns:
+            int: The transaction ID.
+        """
+        self.txn_ctr += 1
+        return self.txn_ctr - 1
+
+    def enqueue(self, handler):
+        """
+        Enqueue a handler into the event handler queue.
+
+        Args:
+            handler (Handler): The handler to be enqueued.
+
+        Returns:
+            int: Token of the event, to cancel it with handler_queue.cancel.
+        """
+        return self.handler_queue.push(handler.time_occured, handler)
+
+    def start(self):
+        """
+        Schedule the first block and transaction of every peer.
+        """
+        self.started = True
+        for peer in self.peers:
+            peer.mineNewBlock(self.genesis, 0)
+
+            # first txn of the peer, each TxnGen schedules the next one
+            peer.scheduleNextTxn(0)
+
+    def run(self, checkpoint_interval=None, checkpoint_path='checkpoint.pkl'):
+        """
+        Run the simulation until simulation_time, then deliver the messages still in flight.
+
+        A simulation restored with load_checkpoint continues where the checkpoint was taken.
+        Events go through the timed handlers of an attached Instrumentation instead of DISPATCH,
+        chosen once before the loop.
+
+        Args:
+            checkpoint_interval (float): Simulated time between two checkpoints, None for no checkpoints.
+                A checkpoint is saved after the first event at or past each multiple of the interval.
+            checkpoint_path (str): Path of the checkpoints, formatted with the time of the checkpoint
+                as 'time', so '{time:.0f}.pkl' keeps every checkpoint instead of the last one.
+        """
+        if not self.started:
+            self.start()
+        queue = self.handler_queue
+        dispatch = DISPATCH if self.instrument is None else self.instrument.dispatch
+        time = self.now
+        events = self.events
+        next_checkpoint = math.inf
+        if checkpoint_interval:
+            next_checkpoint = (math.floor(time / checkpoint_interval) + 1) * checkpoint_interval
+        while(time < self.simulation_time and len(queue) > 0):
+            time, event = queue.pop()
+            dispatch[event.type](event)
+            events += 1
+            if time >= next_checkpoint:
+                self.now = time
+                self.events = events
+                self.save_checkpoint(checkpoint_path.format(time=time))
+                next_checkpoint = (math.floor(time / checkpoint_interval) + 1) * checkpoint_interval
+        self.now = time
+        while(len(queue) > 0):
+            time, event = queue.pop()
+            if event.type in IN_FLIGHT:
+                dispatch[event.type](event)
+                events += 1
+            else:
+                drop(event)
+        self.events = events
+        if self.trace is not None:
+            self.trace.close()
+
+    def save_checkpoint(self, path):
+        """
+        Save the whole state of the simulation, replacing the file at once so a crash
+        while saving leaves the previous checkpoint intact.
+
+        Args:
+            path (str): Path of the checkpoint.
+        """
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def load_checkpoint(path):
+        """
+        Load a simulation saved by save_checkpoint.
+
+        Args:
+            path (str): Path of the checkpoint.
+
+        Returns:
+            Simulation: The simulation, to be continued with run.
+        """
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    def summary(self):
+        """
+        Get the network statistics of the simulation, so far if it is still running.
+
+        Returns:
+            dict: Statistics as returned by stats.network_stats.
+        """
+        return network_stats(self.peers, self.chain_stats)
@@ -0,0 +1,205 @@
+import numpy as np
+
+PEER_TYPES = ['slow_low', 'slow_high', 'fast_low', 'fast_high']
+
+def peer_type(peer):
+    """
+    Get the type of a peer from its speed and CPU.
+
+    Args:
+        peer (Peer): The peer.
+
+    Returns:
+        str: One of PEER_TYPES.
+    """
+    return f"{'slow' if peer.is_slow else 'fast'}_{'low' if peer.is_low_cpu else 'high'}"
+
+class ChainStats:
+    """
+    Chain and branch statistics of a peer's blockchain, updated as the peer accepts blocks.
+
+    The main chain ends at the tip of the peer, which only moves to a strictly longer
+    chain, as in Peer. Each accepted block off the main chain keeps the greatest height
+    in its subtree, and a branch is the subtree of such a block whose parent is on the
+    main chain. Adding a block walks up its side branch at most, and a reorg only touches
+    the blocks between the fork point and the two tips, so no traversal of the tree is
+    needed to report the statistics.
+
+    Attributes:
+        peer_id (int): ID of the observed peer.
+        main (list): blk_id of the main chain block at each chain length, 0 at index 0.
+        children (dict): blk_ids of the accepted children of each block, in order of acceptance.
+        max_height (dict): Greatest chain length in the subtree of each block off the main chain.
+        side_roots (set): Blocks off the main chain whose parent is on it.
+        order (dict): Position of each block in the order of acceptance.
+        chain_miners (dict): Number of main chain blocks mined by each peer type.
+    """
+    def __init__(self, tree, peers, peer_id=0):
+        """
+        Initialize a ChainStats instance and start watching a peer.
+
+        Args:
+            tree (BlockTree): The block tree of the simulation, holding only the genesis block.
+            peers (list): List of Peer objects.
+            peer_id (int): ID of the peer whose blockchain is observed.
+        """
+        self.tree = tree
+        self.peer_id = peer_id
+        self.types = [peer_type(peer) for peer in peers]
+        self.main = [0, 1]
+        self.children = dict()
+        self.max_height = dict()
+        self.side_roots = set()
+        self.order = dict()
+        self.chain_miners = dict.fromkeys(PEER_TYPES, 0)
+        tree.watch(peer_id, self.add)
+
+    def _on_main(self, block):
+        main = self.main
+        return block.chain_length < len(main) and main[block.chain_length] == block.blk_id
+
+    def add(self, blk_id):
+        """
+        Update the statistics with a block accepted by the peer.
+
+        Args:
+            blk_id (int): ID of the block, whose parent was accepted before.
+        """
+        block = self.tree.blocks[blk_id]
+        height = block.chain_length
+        self.order[blk_id] = len(self.order)
+        self.children.setdefault(block.parent_blk.blk_id, []).append(blk_id)
+
+        if height >= len(self.main):
+            if block.parent_blk.blk_id == self.main[-1]:
+                self.main.append(blk_id)
+                self.chain_miners[self.types[block.miner.peer_id]] += 1
+            else:
+                self._reorg(block)
+            return
+
+        self.max_height[blk_id] = height
+        node = block.parent_blk
+        if self._on_main(node):
+            self.side_roots.add(blk_id)
+        while not self._on_main(node) and self.max_height[node.blk_id] < height:
+            self.max_height[node.blk_id] = height
+            node = node.parent_blk
+
+    def _reorg(self, tip):
+        """
+        Move the main chain to a longer chain forking off it.
+
+        Args:
+            tip (Block): The new tip, whose parent is off the main chain.
+        """
+        new_branch = []
+        block = tip
+        while not self._on_main(block):
+            new_branch.append(block)
+            block = block.parent_blk
+        fork = block.chain_length
+
+        # the old branch becomes a single side branch reaching the old tip
+        old_branch = self.main[fork + 1:]
+        old_height = len(self.main) - 1
+        for blk_id in old_branch:
+            self.max_height[blk_id] = old_height
+            self.chain_miners[self.types[int(self.tree.miner[blk_id])]] -= 1
+            self.side_roots.difference_update(self.children.get(blk_id, ()))
+        self.side_roots.add(old_branch[0])
+        del self.main[fork + 1:]
+
+        for block in reversed(new_branch):
+            self.main.append(block.blk_id)
+            self.max_height.pop(block.blk_id, None)
+            self.side_roots.discard(block.blk_id)
+            self.chain_miners[self.types[block.miner.peer_id]] += 1
+        for block in new_branch:
+            for child in self.children.get(block.blk_id, ()):
+                if not self._on_main(self.tree.blocks[child]):
+                    self.side_roots.add(child)
+
+    def branch_lengths(self):
+        """
+        Get the length of each branch off the main chain.
+
+        Returns:
+            list: The lengths, from the branches forking nearest to the tip to those
+            forking at the genesis block, in order of acceptance for a same fork point.
+        """
+        blocks = self.tree.blocks
+        roots = sorted(self.side_roots, key=lambda blk_id: (-blocks[blk_id].chain_length, self.order[blk_id]))
+        return [self.max_height[blk_id] - blocks[blk_id].chain_length + 1 for blk_id in roots]
+
+def network_stats(peers_net, chain_stats):
+    """
+    Compute the chain and branch statistics of a network, as seen by the peer observed by chain_stats.
+
+    Can be called at any time during a run.
+
+    Args:
+        peers_net (list): List of Peer objects.
+        chain_stats (ChainStats): Statistics of the observed peer.
+
+    Returns:
+        dict: Statistics with keys 'longest_chain', 'blocks_mined', 'fraction_in_longest_chain',
+        'chain_share' and 'mined_success' (both keyed by peer type, None when undefined),
+        'branch_lengths', 'avg_branch_length', and 'orphan_hits' and 'orphan_evictions' summed over all peers.
+    """
+    blocks_by_type = dict.fromkeys(PEER_TYPES, 0)
+    for peer in peers_net:
+        blocks_by_type[peer_type(peer)] += peer.created_blocks_own
+
+    longest_chain = len(chain_stats.main) - 1
+    blocks_mined = sum(blocks_by_type.values())
+    branch_lengths = chain_stats.branch_lengths()
+    return {
+        'longest_chain': longest_chain,
+        'blocks_mined': blocks_mined,
+        'fraction_in_longest_chain': (longest_chain - 1) / blocks_mined if blocks_mined > 0 else None,
+        'chain_share': {node_type: successful / (longest_chain - 1) if longest_chain > 1 else None
+                        for node_type, successful in chain_stats.chain_miners.items()},
+        'mined_success': {node_type: successful / blocks_by_type[node_type] if blocks_by_type[node_type] > 0 else None
+                          for node_type, successful in chain_stats.chain_miners.items()},
+        'branch_lengths': branch_lengths,
+        'avg_branch_length': float(np.average(branch_lengths)) if branch_lengths else None,
+        'orphan_hits': sum(peer.orphanBlocks.hits for peer in peers_net),
+        'orphan_evictions': sum(peer.orphanBlocks.evictions for peer in peers_net),
+    }
+
+def print_network_stats(stats):
+    """
+    Print the statistics computed by network_stats.
+
+    Args:
+        stats (dict): The network statistics.
+    """
+    print("Length of longest chain (including genesis block):", stats['longest_chain'])
+    print("Total number of blocks mined:", stats['blocks_mined'])
+    print("Fraction of mined blocks present in longest chain:", round(stats['fraction_in_longest_chain'], 3) if stats['fraction_in_longest_chain'] is not None else "N/A")
+    print()
+
+    for node_type, share in stats['chain_share'].items():
+        if share is not None:
+            print(f"% blocks in longest chain mined by {node_type} node:", round(share, 2))
+        else:
+            print(f"% blocks in longest chain mined by {node_type} node: N/A")
+    print()
+
+    for node_type, success in stats['mined_success'].items():
+        if success is not None:
+            print(f"% blocks mined by {node_type} node that made it to longest chain:", round(success, 2))
+        else:
+            print(f"% blocks mined by {node_type} node that made it to longest chain: N/A")
+    print()
+
+    if stats['branch_lengths']:
+        print("Lengths of branches:", stats['branch_lengths'])
+        print("Average length of branch:", round(stats['avg_branch_length'], 3))
+    else:
+        print("No branches were formed!")
+    print()
+
+    print("Orphan blocks connected to the chain:", stats['orphan_hits'])
+    print("Orphan blocks evicted:", stats['orphan_evictions'])
@@ -0,0 +1,102 @@
+import csv
+import sys
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from helper import SEED
+from simulation import Simulation
+from stats import PEER_TYPES
+
+COLUMNS = ['n', 'z0', 'z1', 'txn_mean', 'seed', 'longest_chain', 'blocks_mined', 'fraction_in_longest_chain',
+           'avg_branch_length', 'num_branches'] + [f'share_{t}' for t in PEER_TYPES] + ['wall_time']
+
+def run_one(params):
+    """
+    Run one simulation and flatten its statistics into a table row.
+
+    Args:
+        params (dict): Keyword arguments of Simulation.
+
+    Returns:
+        dict: The row, keyed by COLUMNS.
+    """
+    start = time.perf_counter()
+    sim = Simulation(**params)
+    sim.run()
+    stats = sim.summary()
+    row = {key: params[key] for key in ('n', 'z0', 'z1', 'txn_mean', 'seed')}
+    row.update({key: stats[key] for key in ('longest_chain', 'blocks_mined', 'fraction_in_longest_chain', 'avg_branch_length')})
+    row['num_branches'] = len(stats['branch_lengths'])
+    row.update({f'share_{t}': stats['chain_share'][t] for t in PEER_TYPES})
+    row['wall_time'] = time.perf_counter() - start
+    return row
+
+def sweep(ns, z0s, z1s, txn_means, seeds, simulation_time, workers=None):
+    """
+    Run a grid of simulations across a process pool.
+
+    Args:
+        ns (list): Numbers of peers.
+        z0s (list): Percentages of slow peers.
+        z1s (list): Percentages of low CPU peers.
+        txn_means (list): Interarrival times between transactions.
+        seeds (list): Seeds, each grid point is run once per seed.
+        simulation_time (float): Simulated time of each run.
+        workers (int): Number of worker processes, defaults to the number of CPUs.
+
+    Returns:
+        list: One row per run, in grid order.
+    """
+    grid = [dict(n=n, z0=z0, z1=z1, txn_mean=txn_mean, simulation_time=simulation_time, seed=seed)
+            for n, z0, z1, txn_mean, seed in itertools.product(ns, z0s, z1s, txn_means, seeds)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_one, grid))
+
+def format_value(value):
+    if value is None:
+        return 'N/A'
+    if isinstance(value, float):
+        return f'{value:.3f}'
+    return str(value)
+
+def print_table(rows):
+    """
+    Print rows as an aligned table.
+
+    Args:
+        rows (list): Rows as returned by sweep.
+    """
+    cells = [COLUMNS] + [[format_value(row[col]) for col in COLUMNS] for row in rows]
+    widths = [max(len(line[i]) for line in cells) for i in range(len(COLUMNS))]
+    for line in cells:
+        print('  '.join(cell.rjust(width) for cell, width in zip(line, widths)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of the P2P network simulation")
+    parser.add_argument("--n", type=int, nargs='+', default=[15], help="Numbers of peers")
+    parser.add_argument("--z0", type=float, nargs='+', default=[10], help="Percentages of slow peers")
+    parser.add_argument("--z1", type=float, nargs='+', default=[40], help="Percentages of low CPU peers")
+    parser.add_argument("--txn-mean", type=float, nargs='+', default=[8], help="Interarrival times between transactions")
+    parser.add_argument("--seeds", type=int, default=1, help="Number of seeds per grid point")
+    parser.add_argument("--seed", type=int, default=SEED, help="First seed, runs use seed, seed+1, ...")
+    parser.add_argument("--simulation-time", type=float, default=10000, help="Simulated time of each run")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--csv", type=str, default=None, help="Also write the table to this CSV file ('-' for stdout)")
+    args = parser.parse_args()
+
+    rows = sweep(args.n, args.z0, args.z1, args.txn_mean, range(args.seed, args.seed + args.seeds),
+                 args.simulation_time, args.workers)
+
+    if args.csv == '-':
+        writer = csv.DictWriter(sys.stdout, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        print_table(rows)
+        if args.csv:
+            with open(args.csv, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=COLUMNS)
+                writer.writeheader()
+                writer.writerows(rows)
@@ -0,0 +1,17 @@
+import main
+from eventtrace import read_trace, write_logs
+from simulation import Simulation
+
+
+def test_trace_logs_match_run_logs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'logs').mkdir()
+    (tmp_path / 'trace_logs').mkdir()
+    sim = Simulation(n=8, simulation_time=4000, seed=2, trace_path=str(tmp_path / 'trace.bin'))
+    sim.run()
+    main.write_logs(sim.tree, sim.n)
+    n, records = read_trace(str(tmp_path / 'trace.bin'))
+    write_logs(records, n, str(tmp_path / 'trace_logs'))
+    for peer_id in range(sim.n):
+        name = f'log_tree_{peer_id}.txt'
+        assert (tmp_path / 'logs' / name).read_bytes() == (tmp_path / 'trace_logs' / name).read_bytes()
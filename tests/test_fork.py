@@ -0,0 +1,102 @@
+import numpy as np
+
+from block import Block
+from handler import Handler, TXN_RECV, BLOCK_RECV
+from simulation import Simulation
+
+
+def make_sim():
+    return Simulation(n=4, simulation_time=1000, seed=7)
+
+
+def new_txn(sim, sender=1, receiver=2):
+    return sim.txns.add(sim.new_txn_id(), sender, receiver, 1)
+
+
+def mine(sim, parent, txns=(), miner=0):
+    coinbase = sim.txns.add(sim.new_txn_id(), miner, miner, 50, True)
+    block = Block(sim.peers[miner], parent, np.array(list(txns) + [coinbase], dtype=np.int64), txns=sim.txns)
+    sim.tree.add(block, 0)
+    block.index_txns(sim.txns)
+    return block
+
+
+def receive_txn(peer, txn, sender=1):
+    peer.txnRecv(Handler(TXN_RECV, 0, sender, peer, txn))
+
+
+def receive_block(peer, block, sender=0):
+    peer.verifyAndAddReceivedBlock(Handler(BLOCK_RECV, 0, sender=peer.sim.peers[sender], receiver=peer, blk=block))
+
+
+def test_losing_branch_txn_returns_to_pending_and_is_mined_again():
+    sim = make_sim()
+    peer = sim.peers[3]
+    txn = new_txn(sim)
+    receive_txn(peer, txn)
+    a1 = mine(sim, sim.genesis, [txn])
+    receive_block(peer, a1)
+    assert peer.lastBlock() is a1
+    assert txn not in peer.pendingTxns
+
+    b1 = mine(sim, sim.genesis)
+    b2 = mine(sim, b1)
+    receive_block(peer, b1)
+    assert peer.lastBlock() is a1
+    receive_block(peer, b2)
+    assert peer.lastBlock() is b2
+    assert txn in peer.pendingTxns
+    assert not peer.chainIncludes(txn)
+
+    block = peer.buildBlock(b2)
+    assert txn in block.txn_in_blk.tolist()
+
+
+def test_txn_received_after_its_block():
+    sim = make_sim()
+    peer = sim.peers[3]
+    txn = new_txn(sim)
+    a1 = mine(sim, sim.genesis, [txn])
+    receive_block(peer, a1)
+    receive_txn(peer, txn)
+    assert txn in peer.txnReceived
+    assert txn not in peer.pendingTxns
+
+    b1 = mine(sim, sim.genesis)
+    b2 = mine(sim, b1)
+    receive_block(peer, b1)
+    receive_block(peer, b2)
+    assert txn in peer.pendingTxns
+
+
+def test_unreceived_txn_of_losing_branch_stays_out_of_pending():
+    sim = make_sim()
+    peer = sim.peers[3]
+    txn = new_txn(sim)
+    a1 = mine(sim, sim.genesis, [txn])
+    receive_block(peer, a1)
+    b1 = mine(sim, sim.genesis)
+    b2 = mine(sim, b1)
+    receive_block(peer, b1)
+    receive_block(peer, b2)
+    assert peer.lastBlock() is b2
+    assert txn not in peer.pendingTxns
+
+
+def test_reorg_onto_branch_completed_from_orphan_pool():
+    sim = make_sim()
+    peer = sim.peers[3]
+    txn, other = new_txn(sim), new_txn(sim, sender=2, receiver=1)
+    receive_txn(peer, txn)
+    receive_txn(peer, other)
+    a1 = mine(sim, sim.genesis, [txn])
+    receive_block(peer, a1)
+
+    b1 = mine(sim, sim.genesis)
+    b2 = mine(sim, b1, [other])
+    receive_block(peer, b2)
+    assert peer.lastBlock() is a1
+    receive_block(peer, b1)
+    assert peer.lastBlock() is b2
+    assert txn in peer.pendingTxns
+    assert other not in peer.pendingTxns
@@ -0,0 +1,86 @@
+import gc
+import math
+import weakref
+
+import pytest
+
+from simulation import Simulation
+from instrument import Instrumentation
+from pdes import PartitionSimulation
+
+# runs whose tip moves after simulation_time, while a BlockMined event was already dropped
+PARAMS = dict(n=6, z0=50, z1=0, txn_mean=200, simulation_time=300)
+
+
+def assert_drained(sim):
+    # cancelled entries may stay in the heap, but every cancelled token must still be
+    # queued and no live event may be left behind
+    queue = sim.handler_queue
+    assert queue.cancelled == {seq for _, seq, _ in queue.heap}
+    assert len(queue) == 0
+    assert all(peer.miningToken is None for peer in sim.peers)
+
+
+@pytest.mark.parametrize("seed", [148, 170])
+def test_run_drains_queue(seed):
+    sim = Simulation(seed=seed, **PARAMS)
+    sim.run()
+    assert_drained(sim)
+
+
+@pytest.mark.parametrize("seed", [148, 170])
+def test_instrumented_run_drains_queue(seed):
+    sim = Simulation(seed=seed, **PARAMS)
+    Instrumentation(sim).run()
+    assert_drained(sim)
+
+
+@pytest.mark.parametrize("seed", [148, 170])
+def test_partition_window_drains_queue(seed):
+    sim = PartitionSimulation(0, [0] * PARAMS['n'], seed=seed, **PARAMS)
+    sim.start()
+    sim.run_window(math.inf)
+    assert_drained(sim)
+
+
+def test_finished_simulation_is_freed():
+    sim = Simulation(n=10, simulation_time=3000, seed=1)
+    sim.run()
+    assert len(sim.tree.balance_cache) > 0
+    ref = weakref.ref(sim)
+    del sim
+    gc.collect()
+    assert ref() is None
+
+
+def test_events_count_handled_events():
+    sim = Simulation(seed=148, **PARAMS)
+    sim.run()
+    instrumented = Simulation(seed=148, **PARAMS)
+    instrument = Instrumentation(instrumented)
+    instrument.run()
+    assert sim.events == instrumented.events == sum(instrument.counts)
+    assert sim.events < sim.handler_queue.seq
+
+
+def test_instrumented_mining_counts_candidates():
+    sim = Simulation(n=10, simulation_time=3000, seed=1)
+    instrument = Instrumentation(sim)
+    instrument.run()
+    mining = instrument.report()['mining']
+    assert mining['calls'] == sim.blk_create_ctr > 0
+    assert 0 < mining['selected'] <= mining['candidates']
+    assert mining['max_candidates'] <= mining['candidates']
+
+
+def test_instrumented_run_matches_plain_run_with_checkpoints(tmp_path):
+    sim = Simulation(n=10, simulation_time=3000, seed=1)
+    sim.run()
+    instrumented = Simulation(n=10, simulation_time=3000, seed=1)
+    instrument = Instrumentation(instrumented)
+    instrument.run(checkpoint_interval=1000, checkpoint_path=str(tmp_path / '{time:.0f}.pkl'))
+    assert len(list(tmp_path.iterdir())) >= 2
+    assert instrumented.events == sim.events == sum(instrument.counts)
+    assert [block.txn_in_blk.tolist() for block in instrumented.tree.blocks[1:]] == \
+           [block.txn_in_blk.tolist() for block in sim.tree.blocks[1:]]
+    assert instrument.queue_depth
@@ -0,0 +1,21 @@
+import networkx as nx
+import pytest
+
+from topology import TOPOLOGIES, make_topology, regular_graph
+
+
+@pytest.mark.parametrize("kind", sorted(TOPOLOGIES))
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5, 20])
+def test_small_networks_are_connected(kind, n):
+    graph = make_topology(kind, n, seed=1)
+    assert sorted(graph.nodes) == list(range(n))
+    assert nx.is_connected(graph)
+
+
+def test_regular_degree_lowered_for_small_n():
+    assert {degree for _, degree in regular_graph(4, seed=1).degree()} == {3}
+
+
+def test_regular_odd_degree_sum_rejected():
+    with pytest.raises(ValueError):
+        regular_graph(5, degree=3)
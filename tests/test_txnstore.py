@@ -0,0 +1,38 @@
+import random
+
+import numpy as np
+
+from txnstore import TxnSet
+
+
+def test_txn_set_matches_set():
+    rng = random.Random(1)
+    txn_set, expected = TxnSet(), set()
+    for _ in range(5000):
+        op = rng.random()
+        ids = np.array([rng.randrange(3000) for _ in range(rng.randrange(6))], dtype=np.int64)
+        if op < 0.3:
+            txn_set.add(int(ids[0]) if len(ids) else 0)
+            expected.add(int(ids[0]) if len(ids) else 0)
+        elif op < 0.5:
+            txn_set.discard(int(ids[0]) if len(ids) else 0)
+            expected.discard(int(ids[0]) if len(ids) else 0)
+        elif op < 0.75:
+            txn_set.update(ids)
+            expected.update(ids.tolist())
+        else:
+            txn_set.difference_update(ids)
+            expected.difference_update(ids.tolist())
+        assert len(txn_set) == len(expected)
+        if op > 0.95:
+            assert txn_set.ids().tolist() == sorted(expected)
+    assert list(txn_set) == sorted(expected)
+
+
+def test_txn_set_union():
+    first, second = TxnSet(), TxnSet()
+    first.update(np.array([1, 2, 700]))
+    second.update(np.array([2, 90000]))
+    first |= second
+    assert first.ids().tolist() == [1, 2, 700, 90000]
+    assert len(first) == 4
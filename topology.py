@@ -0,0 +1,251 @@
+import math
+import numpy as np
+import networkx as nx
+
+# degree bounds of every peer
+MIN_DEGREE, MAX_DEGREE = 3, 6
+# degree of regular_graph
+REGULAR_DEGREE = 4
+# rounds of random stub matching before the peers left short of edges are wired one by one
+MATCHING_ROUNDS = 5
+# random picks tried before scanning all peers for one with a free slot
+FILL_TRIES = 16
+# nearest peers considered as neighbours by geographic_graph
+NEAREST = 8
+
+class _Wiring:
+    """
+    Simple undirected graph under construction, with a cap on the degree of every node.
+
+    Attributes:
+        neighbours (list): Set of neighbours of each node.
+        max_degree (int): Greatest degree of a node.
+    """
+    def __init__(self, n, max_degree):
+        self.neighbours = [set() for _ in range(n)]
+        self.max_degree = max_degree
+
+    def connect(self, u, v):
+        """
+        Add the edge (u, v) unless it is a loop, already exists or a node is full.
+
+        Returns:
+            bool: Whether the edge was added.
+        """
+        neighbours = self.neighbours
+        if u == v or v in neighbours[u] or len(neighbours[u]) >= self.max_degree or len(neighbours[v]) >= self.max_degree:
+            return False
+        neighbours[u].add(v)
+        neighbours[v].add(u)
+        return True
+
+    def connect_chain(self, order, closed=True):
+        """
+        Connect consecutive nodes of an order, which makes the graph connected.
+
+        Args:
+            order (list): All nodes.
+            closed (bool): Whether the last node is also connected to the first.
+        """
+        for u, v in zip(order, order[1:]):
+            self.connect(u, v)
+        if closed and len(order) > 2:
+            self.connect(order[-1], order[0])
+
+    def degrees(self):
+        return np.array([len(neighbours) for neighbours in self.neighbours])
+
+    def match_stubs(self, stubs, rng, rounds=MATCHING_ROUNDS):
+        """
+        Pair free edge ends at random, keeping the pairs that make valid edges.
+
+        Args:
+            stubs (numpy.ndarray): Node of each free edge end.
+            rng (numpy.random.Generator): Generator for the pairing.
+            rounds (int): Number of times the unpaired ends are shuffled again.
+        """
+        for _ in range(rounds):
+            if len(stubs) < 2:
+                break
+            stubs = rng.permutation(stubs).tolist()
+            unpaired = stubs[len(stubs) - len(stubs) % 2:]
+            for u, v in zip(stubs[0::2], stubs[1::2]):
+                if not self.connect(u, v):
+                    unpaired += (u, v)
+            stubs = np.array(unpaired, dtype=int)
+
+    def fill(self, min_degree, rng):
+        """
+        Connect every node below min_degree to random nodes with a free slot.
+
+        When every other node is full or a neighbour, an edge (v, w) is split into (u, v)
+        and (u, w), which keeps the degrees of v and w and the connectivity of the graph.
+
+        Args:
+            min_degree (int): Smallest degree of a node.
+            rng (numpy.random.Generator): Generator for the picks.
+
+        Raises:
+            ValueError: If a node cannot reach min_degree.
+        """
+        neighbours = self.neighbours
+        n = len(neighbours)
+        for u in range(n):
+            while len(neighbours[u]) < min_degree:
+                if any(self.connect(u, int(v)) for v in rng.integers(n, size=FILL_TRIES)):
+                    continue
+                free = [v for v in range(n) if v != u and v not in neighbours[u] and len(neighbours[v]) < self.max_degree]
+                if free:
+                    self.connect(u, free[rng.integers(len(free))])
+                    continue
+                if len(neighbours[u]) + 2 > self.max_degree:
+                    raise ValueError(f"cannot give node {u} degree {min_degree}")
+                split = next(((v, w) for v in range(n) if v != u and v not in neighbours[u]
+                              for w in neighbours[v] if w != u and w not in neighbours[u]), None)
+                if split is None:
+                    raise ValueError(f"cannot give node {u} degree {min_degree}")
+                v, w = split
+                neighbours[v].remove(w)
+                neighbours[w].remove(v)
+                self.connect(u, v)
+                self.connect(u, w)
+
+    def graph(self):
+        graph = nx.Graph()
+        graph.add_nodes_from(range(len(self.neighbours)))
+        graph.add_edges_from((u, v) for u, neighbours in enumerate(self.neighbours) for v in neighbours if u < v)
+        return graph
+
+def _degree_bounds(n, min_degree, max_degree):
+    max_degree = min(max_degree, n - 1)
+    return min(min_degree, max_degree), max_degree
+
+def bounded_degree_graph(n, min_degree=MIN_DEGREE, max_degree=MAX_DEGREE, seed=None):
+    """
+    Build a random connected graph whose degrees are between min_degree and max_degree.
+
+    The nodes are first joined in a ring in random order, which makes the graph connected.
+    Each node then draws a target degree and its missing edge ends are paired at random,
+    and the few nodes left short of min_degree are wired one by one, so the graph is
+    built in time linear in n.
+
+    Args:
+        n (int): Number of nodes.
+        min_degree (int): Smallest degree, lowered to max_degree for small n.
+        max_degree (int): Greatest degree, lowered to n - 1 for small n.
+        seed (int or numpy.random.Generator): Seed of the graph.
+
+    Returns:
+        networkx.Graph: The graph, with nodes 0 to n - 1.
+    """
+    rng = np.random.default_rng(seed)
+    min_degree, max_degree = _degree_bounds(n, min_degree, max_degree)
+    wiring = _Wiring(n, max_degree)
+    wiring.connect_chain(rng.permutation(n).tolist())
+    target = rng.integers(min_degree, max_degree + 1, n)
+    wiring.match_stubs(np.repeat(np.arange(n), np.maximum(target - wiring.degrees(), 0)), rng)
+    wiring.fill(min_degree, rng)
+    return wiring.graph()
+
+def regular_graph(n, degree=REGULAR_DEGREE, seed=None):
+    """
+    Build a random connected graph in which every node has the same degree.
+
+    Args:
+        n (int): Number of nodes, with n * degree even.
+        degree (int): Degree of every node, lowered to n - 1 for small n.
+        seed (int or numpy.random.Generator): Seed of the graph.
+
+    Returns:
+        networkx.Graph: The graph, with nodes 0 to n - 1.
+
+    Raises:
+        ValueError: If n * degree is odd.
+    """
+    if n == 0:
+        return nx.empty_graph(0)
+    degree = min(degree, n - 1)
+    if n * degree % 2:
+        raise ValueError(f"no {degree}-regular graph on {n} nodes, n * degree must be even")
+    rng = np.random.default_rng(seed)
+    while True:
+        graph = nx.random_regular_graph(degree, n, seed=rng)
+        if nx.is_connected(graph):
+            return graph
+
+def geographic_graph(n, min_degree=MIN_DEGREE, max_degree=MAX_DEGREE, nearest=NEAREST, seed=None):
+    """
+    Build a random connected graph of nearby nodes placed uniformly in the unit square.
+
+    The nodes are joined in a path that sweeps the square in strips, which makes the graph
+    connected with short edges. Each node then draws a target degree and edges to the
+    nearest nodes, found in a grid of cells, are added from the shortest while both ends
+    are below their target.
+
+    Args:
+        n (int): Number of nodes.
+        min_degree (int): Smallest degree, lowered to max_degree for small n.
+        max_degree (int): Greatest degree, lowered to n - 1 for small n.
+        nearest (int): Number of nearest nodes considered as neighbours of each node.
+        seed (int or numpy.random.Generator): Seed of the graph.
+
+    Returns:
+        networkx.Graph: The graph, with nodes 0 to n - 1 and their position in the 'pos' attribute.
+    """
+    rng = np.random.default_rng(seed)
+    min_degree, max_degree = _degree_bounds(n, min_degree, max_degree)
+    pos = rng.random((n, 2))
+    wiring = _Wiring(n, max_degree)
+
+    # strips are swept alternately left to right and right to left
+    strips = max(1, int(math.sqrt(n)))
+    strip = np.minimum((pos[:, 1] * strips).astype(int), strips - 1)
+    wiring.connect_chain(np.lexsort((np.where(strip % 2 == 0, pos[:, 0], -pos[:, 0]), strip)).tolist(), closed=False)
+
+    # about two nodes per cell
+    side = max(1, int(math.sqrt(n / 2)))
+    cell = np.minimum((pos * side).astype(int), side - 1)
+    by_cell = np.lexsort((cell[:, 1], cell[:, 0]))
+    starts = np.searchsorted(cell[by_cell, 0] * side + cell[by_cell, 1], np.arange(side * side + 1))
+    nearest = min(nearest, n - 1)
+    candidates = []
+    for u in range(n):
+        x, y = cell[u]
+        radius = 1
+        while True:
+            found = np.concatenate([by_cell[starts[i * side + max(y - radius, 0)]:starts[i * side + min(y + radius, side - 1) + 1]]
+                                    for i in range(max(x - radius, 0), min(x + radius, side - 1) + 1)])
+            if len(found) > nearest or radius >= side:
+                break
+            radius += 1
+        found = found[found != u]
+        distance = np.hypot(*(pos[found] - pos[u]).T)
+        closest = np.argsort(distance)[:nearest]
+        candidates.extend(zip(distance[closest].tolist(), [u] * len(closest), found[closest].tolist()))
+
+    target = rng.integers(min_degree, max_degree + 1, n)
+    neighbours = wiring.neighbours
+    for _, u, v in sorted(candidates):
+        if len(neighbours[u]) < target[u] and len(neighbours[v]) < target[v]:
+            wiring.connect(u, v)
+    wiring.fill(min_degree, rng)
+
+    graph = wiring.graph()
+    nx.set_node_attributes(graph, dict(enumerate(map(tuple, pos.tolist()))), 'pos')
+    return graph
+
+TOPOLOGIES = {'bounded': bounded_degree_graph, 'regular': regular_graph, 'geographic': geographic_graph}
+
+def make_topology(kind, n, seed=None):
+    """
+    Build the topology of a network.
+
+    Args:
+        kind (str): One of 'bounded', 'regular' or 'geographic'.
+        n (int): Number of peers.
+        seed (int or numpy.random.Generator): Seed of the graph.
+
+    Returns:
+        networkx.Graph: The graph, with nodes 0 to n - 1.
+    """
+    return TOPOLOGIES[kind](n, seed=seed)
@@ -0,0 +1,280 @@
+import numpy as np
+
+# size of a txn, the unit of message sizes
+TXN_SIZE = 1
+# initial number of txn slots of a TxnStore
+STORE_CAPACITY = 1 << 12
+# bytes of a TxnSet chunk, each holding 8 * CHUNK_BYTES txns
+CHUNK_BYTES = 64
+# log2 of the txns of a chunk, the shift from a txnId to its chunk
+CHUNK_SHIFT = 9
+
+class TxnStore:
+    """
+    Columnar store of the transactions of a simulation.
+
+    A transaction is its integer ID, indexing one numpy array per field, so holding or
+    sending a transaction costs a machine integer and the fields of many transactions
+    are read with one fancy index. Slots of IDs never handed out keep sender -1.
+
+    Attributes:
+        sender (numpy.ndarray): peer_id of the sender of each txn, the miner for coinbase txns.
+        receiver (numpy.ndarray): peer_id of the receiver of each txn.
+        coins (numpy.ndarray): Coins of each txn, set when it is sent.
+        coinbase (numpy.ndarray): Whether each txn is a coinbase txn.
+        block (numpy.ndarray): blk_id of the first mined block including each txn, 0 if none.
+        more_blocks (dict): blk_ids of the other mined blocks including a txn, by txnId.
+    """
+    def __init__(self, capacity=STORE_CAPACITY):
+        """
+        Initialize an empty TxnStore.
+
+        Args:
+            capacity (int): Initial number of txn slots.
+        """
+        self.sender = np.full(capacity, -1, dtype=np.int32)
+        self.receiver = np.full(capacity, -1, dtype=np.int32)
+        self.coins = np.zeros(capacity, dtype=np.int64)
+        self.coinbase = np.zeros(capacity, dtype=bool)
+        self.block = np.zeros(capacity, dtype=np.int32)
+        self.more_blocks = dict()
+
+    def __len__(self):
+        """
+        Get the number of txn slots.
+        """
+        return len(self.sender)
+
+    def _grow(self, size):
+        capacity = max(2 * len(self.sender), size)
+        for name, fill in (('sender', -1), ('receiver', -1), ('coins', 0), ('coinbase', False), ('block', 0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, txn_id, sender, receiver, coins=0, coinbase=False):
+        """
+        Record a transaction.
+
+        Args:
+            txn_id (int): ID of the transaction, from Simulation.new_txn_id.
+            sender (int): peer_id of the sender, the miner for a coinbase txn.
+            receiver (int): peer_id of the receiver.
+            coins (int): Number of coins, or 0 until the txn is sent.
+            coinbase (bool): Whether the txn is a coinbase txn.
+
+        Returns:
+            int: The txn_id.
+        """
+        if txn_id >= len(self.sender):
+            self._grow(txn_id + 1)
+        self.sender[txn_id] = sender
+        self.receiver[txn_id] = receiver
+        self.coins[txn_id] = coins
+        self.coinbase[txn_id] = coinbase
+        return txn_id
+
+    def known(self, txn_id):
+        """
+        Check if a transaction was recorded.
+
+        Args:
+            txn_id (int): ID of the transaction.
+
+        Returns:
+            bool: True if the txn is in the store.
+        """
+        return txn_id < len(self.sender) and self.sender[txn_id] >= 0
+
+    def index_block(self, txn_ids, blk_id):
+        """
+        Record a mined block in the inclusion index of its transactions.
+
+        Args:
+            txn_ids (numpy.ndarray): txnIds of the block.
+            blk_id (int): ID of the block.
+        """
+        first = self.block[txn_ids]
+        self.block[txn_ids[first == 0]] = blk_id
+        for txn_id in txn_ids[first != 0].tolist():
+            self.more_blocks.setdefault(txn_id, []).append(blk_id)
+
+    def blocks_of(self, txn_id):
+        """
+        Get the mined blocks including a transaction.
+
+        Args:
+            txn_id (int): ID of the transaction.
+
+        Returns:
+            list: The blk_ids, in the order the blocks were mined.
+        """
+        first = int(self.block[txn_id])
+        if first == 0:
+            return []
+        return [first] + self.more_blocks.get(txn_id, [])
+
+    def deltas(self, txn_ids):
+        """
+        Sum the balance changes made by transactions.
+
+        Args:
+            txn_ids (numpy.ndarray): txnIds.
+
+        Returns:
+            dict: Change of balance by peer_id, for the peers the txns touch.
+        """
+        delta = dict()
+        for sender, receiver, coins, coinbase in zip(self.sender[txn_ids].tolist(), self.receiver[txn_ids].tolist(),
+                                                     self.coins[txn_ids].tolist(), self.coinbase[txn_ids].tolist()):
+            if not coinbase:
+                delta[sender] = delta.get(sender, 0) - coins
+            delta[receiver] = delta.get(receiver, 0) + coins
+        return delta
+
+    def nbytes(self):
+        """
+        Get the memory held by the columns.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return sum(column.nbytes for column in (self.sender, self.receiver, self.coins, self.coinbase, self.block))
+
+class TxnSet:
+    """
+    Growable bitset of txnIds.
+
+    Bits are kept in a bytearray, so a single txn is tested or added with one byte
+    operation, while many txns at once are handled through a numpy view of the bytes.
+    A byte per chunk of CHUNK_BYTES bytes flags the chunks that may hold a txn, so
+    listing the set skips the empty stretches of the txn history. Flags are set when a
+    txn is added and cleared lazily, by ids, once their chunk is found empty.
+
+    Attributes:
+        bits (bytearray): Bit i & 7 of byte i >> 3 is set if txn i is in the set.
+        chunks (bytearray): Byte j is set if chunk j of bits may hold a txn.
+        count (int): Number of txns in the set.
+    """
+    __slots__ = ('bits', 'chunks', 'count')
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.chunks = bytearray()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, txn_id):
+        byte = txn_id >> 3
+        return byte < len(self.bits) and self.bits[byte] >> (txn_id & 7) & 1 == 1
+
+    def __iter__(self):
+        return iter(self.ids().tolist())
+
+    def _reserve(self, txn_id):
+        chunks = (txn_id >> CHUNK_SHIFT) + 1
+        if chunks > len(self.chunks):
+            chunks = max(chunks, 2 * len(self.chunks))
+            self.bits.extend(bytes(chunks * CHUNK_BYTES - len(self.bits)))
+            self.chunks.extend(bytes(chunks - len(self.chunks)))
+
+    def _view(self):
+        return np.frombuffer(self.bits, dtype=np.uint8)
+
+    def add(self, txn_id):
+        """
+        Add a txn to the set.
+
+        Args:
+            txn_id (int): ID of the txn.
+        """
+        byte, bit = txn_id >> 3, 1 << (txn_id & 7)
+        if byte >= len(self.bits):
+            self._reserve(txn_id)
+        if not self.bits[byte] & bit:
+            self.bits[byte] |= bit
+            self.chunks[txn_id >> CHUNK_SHIFT] = 1
+            self.count += 1
+
+    def discard(self, txn_id):
+        """
+        Remove a txn from the set if it is there.
+
+        Args:
+            txn_id (int): ID of the txn.
+        """
+        if txn_id in self:
+            self.bits[txn_id >> 3] &= ~(1 << (txn_id & 7)) & 0xff
+            self.count -= 1
+
+    def contains(self, txn_ids):
+        """
+        Test many txns at once.
+
+        Args:
+            txn_ids (numpy.ndarray): txnIds.
+
+        Returns:
+            numpy.ndarray: Whether each txn is in the set.
+        """
+        bytes_ = txn_ids >> 3
+        inside = bytes_ < len(self.bits)
+        found = np.zeros(len(txn_ids), dtype=bool)
+        found[inside] = (self._view()[bytes_[inside]] >> (txn_ids[inside] & 7)) & 1 == 1
+        return found
+
+    def update(self, txn_ids):
+        """
+        Add many txns at once, in time proportional to their number.
+
+        Args:
+            txn_ids (numpy.ndarray): txnIds.
+        """
+        txn_ids = np.unique(txn_ids[~self.contains(txn_ids)])
+        if len(txn_ids) == 0:
+            return
+        self._reserve(int(txn_ids[-1]))
+        np.bitwise_or.at(self._view(), txn_ids >> 3, (1 << (txn_ids & 7)).astype(np.uint8))
+        np.frombuffer(self.chunks, dtype=np.uint8)[txn_ids >> CHUNK_SHIFT] = 1
+        self.count += len(txn_ids)
+
+    def difference_update(self, txn_ids):
+        """
+        Remove many txns at once, ignoring those not in the set.
+
+        Args:
+            txn_ids (numpy.ndarray): txnIds.
+        """
+        txn_ids = np.unique(txn_ids[self.contains(txn_ids)])
+        if len(txn_ids) == 0:
+            return
+        np.bitwise_and.at(self._view(), txn_ids >> 3, ~(1 << (txn_ids & 7)).astype(np.uint8))
+        self.count -= len(txn_ids)
+
+    def ids(self):
+        """
+        Get the txns of the set, reading only the chunks flagged as possibly non-empty.
+
+        Returns:
+            numpy.ndarray: The txnIds, in increasing order.
+        """
+        flags = np.frombuffer(self.chunks, dtype=np.uint8)
+        chunks = np.flatnonzero(flags)
+        rows = self._view().reshape(-1, CHUNK_BYTES)[chunks]
+        empty = ~rows.any(axis=1)
+        flags[chunks[empty]] = 0
+        chunks, rows = chunks[~empty], rows[~empty]
+        positions = np.flatnonzero(np.unpackbits(rows, axis=1, bitorder='little'))
+        return (chunks[positions // (8 * CHUNK_BYTES)] << CHUNK_SHIFT) + positions % (8 * CHUNK_BYTES)
+
+    def __ior__(self, other):
+        self._reserve(len(other.bits) * 8 - 1)
+        view = self._view()
+        view[:len(other.bits)] |= other._view()
+        flags = np.frombuffer(self.chunks, dtype=np.uint8)
+        flags[:len(other.chunks)] |= np.frombuffer(other.chunks, dtype=np.uint8)
+        self.count = int.from_bytes(self.bits, 'little').bit_count()
+        return self